@@ -0,0 +1,183 @@
+# bench_crawl.py
+import sys
+import os
+
+# Add the src and project root directories to sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.extend([ROOT, os.path.join(ROOT, 'src')])
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+import aiohttp
+import urls
+from client import TouhouClient
+from circle import Circle
+from album import Album
+from song import Songs
+from crawler import Crawler
+from mock_server import serve, settings_arguments, settings_from
+from util.concurrency import bounded_gather
+from util.general import ClientConfig, CrawlerConfig
+
+
+class TimedClient(TouhouClient):
+    """
+    `TouhouClient` that records the wall time of every `get_json` call, retries included.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    async def get_json(self, url, params=None, headers=None, revalidate=False):
+        start = time.perf_counter()
+        try:
+            return await super().get_json(url, params=params, headers=headers, revalidate=revalidate)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def _run_server(settings, port, ready):
+    async def run():
+        await serve(settings, port=port)
+        ready.set()
+        await asyncio.Event().wait()
+    asyncio.run(run())
+
+
+async def _server_call(method, base):
+    async with aiohttp.ClientSession() as session:
+        async with session.request(method, f"{base}_{'stats' if method == 'GET' else 'reset'}") as response:
+            return await response.json()
+
+
+async def entity_scenario(client, args):
+    """
+    Fetch `args.count` distinct circles, albums and songs by ID, `args.concurrency` at a time.
+    """
+    circle = Circle(client=client)
+    album = Album(circle)
+    songs = Songs(album)
+    ops = []
+    for n in range(args.count):
+        kind = n % 3
+        if kind == 0:
+            ops.append(lambda n=n: circle.search_by_id(n + 1))
+        elif kind == 1:
+            ops.append(lambda n=n: album._album_details(1000 + n))
+        else:
+            ops.append(lambda n=n: songs._fetch_song_details(100000 + n))
+    results = await bounded_gather((op() for op in ops), args.concurrency)
+    return sum(1 for r in results if isinstance(r, Exception) or 'error' in r)
+
+
+async def circle_scenario(client, args):
+    """
+    Crawl `args.count` circles end to end: details, album listing, albums, songs and lyrics.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        CrawlerConfig.configure(checkpoint_path=os.path.join(tmp, 'checkpoint.json'), lean=args.lean)
+        stats = await Crawler(client).crawl(list(range(1, args.count + 1)))
+    return stats['errors']
+
+
+SCENARIOS = {
+    'entity': entity_scenario,
+    'circle': circle_scenario,
+}
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+async def run_scenario(name, args, base):
+    """
+    Run one scenario against the mock server.
+
+    Returns:
+        A dictionary of throughput, latency, memory and connection figures.
+    """
+    await _server_call('POST', base)
+    tracemalloc.start()
+    async with TimedClient() as client:
+        start = time.perf_counter()
+        failures = await SCENARIOS[name](client, args)
+        elapsed = time.perf_counter() - start
+        latencies = sorted(client.latencies)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    server = await _server_call('GET', base)
+    return {
+        "scenario": name,
+        "calls": len(latencies),
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "peak_mb": round(peak / 2**20, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "server_requests": server['requests'],
+        "injected_errors": server['errors'],
+        "connections": server['connections'],
+    }
+
+
+async def run(args):
+    base = f"http://127.0.0.1:{args.port}/"
+    urls.TDB_USAGE_URL.URL = base
+    urls.THWIKI.API_URL = f"{base}api.php?"
+    ClientConfig.configure(default_rate_limit=args.rate, burst=args.rate, backoff_base=0.01, backoff_max=0.1)
+    return [await run_scenario(name, args, base) for name in args.scenarios]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Circle/Album/Songs against a local mock server.")
+    parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all).")
+    parser.add_argument('--count', type=int, default=300, help="Entities (entity) or circles (circle) per run.")
+    parser.add_argument('--concurrency', type=int, default=20, help="Concurrent lookups in the entity scenario.")
+    parser.add_argument('--rate', type=float, default=10000.0, help="Client rate limit per host.")
+    parser.add_argument('--lean', action='store_true', help="Crawl with field projections.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+    settings_arguments(parser)
+    args = parser.parse_args(argv)
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # The server runs in its own process so its CPU and memory do not skew the client figures.
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=_run_server, args=(settings_from(args), args.port, ready), daemon=True)
+    server.start()
+    try:
+        if not ready.wait(10):
+            raise RuntimeError("Mock server did not start")
+        results = asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print('  '.join(f"{c:>15}" for c in columns))
+    for row in results:
+        print('  '.join(f"{row[c]!s:>15}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# bench_decode.py
+import sys
+import os
+
+# Add the src and project root directories to sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.extend([ROOT, os.path.join(ROOT, 'src')])
+
+import argparse
+import json
+import time
+from decoding import _decoder, available_backends
+from models import MODELS
+
+
+def _artist(i):
+    return {
+        "id": i, "name": f"Circle {i}", "defaultName": f"Circle {i}", "defaultNameLanguage": "Japanese",
+        "additionalNames": f"サークル{i}, Circle-{i}", "artistType": "Circle", "status": "Finished",
+        "mainPicture": {"mime": "image/png", "urlOriginal": f"https://touhoudb.com/Artist/Picture/{i}",
+                        "urlThumb": f"https://touhoudb.com/Artist/Picture/{i}?thumb"},
+        "createDate": "2012-08-12T00:00:00", "version": 7,
+        "description": "A doujin circle. " * 20,
+    }
+
+
+def _album(i, tracks):
+    return {
+        "id": i, "name": f"Album {i}", "defaultName": f"Album {i}", "additionalNames": f"アルバム{i}",
+        "artistString": "Circle feat. Vocalist", "discType": "Album", "version": 12,
+        "releaseDate": {"day": 30, "month": 12, "year": 2019, "formatted": "2019/12/30", "isEmpty": False},
+        "releaseEvent": {"id": 99, "name": "Comiket 97", "category": "Comiket"},
+        "mainPicture": {"urlOriginal": f"https://touhoudb.com/Album/CoverPicture/{i}"},
+        "artists": [{"artist": _artist(j), "categories": "Producer", "roles": "Default"} for j in range(3)],
+        "songs": [
+            {"discNumber": 1, "trackNumber": n, "name": f"Track {n}",
+             "song": {"id": i * 100 + n, "name": f"Track {n}", "songType": "Arrangement",
+                      "artistString": "Circle", "lengthSeconds": 240}}
+            for n in range(1, tracks + 1)
+        ],
+        "tags": [{"tag": {"id": t, "name": f"tag{t}"}, "count": t} for t in range(15)],
+    }
+
+
+def _song(i):
+    return {
+        "song": {"id": i, "name": f"Song {i}", "defaultName": f"Song {i}", "additionalNames": f"曲{i}",
+                 "songType": "Arrangement", "artistString": "Circle", "originalVersionId": i - 1,
+                 "lengthSeconds": 240, "version": 3},
+        "albums": [{"id": a, "name": f"Album {a}", "artistString": "Circle"} for a in range(4)],
+        "artists": [{"artist": _artist(j), "categories": "Vocalist"} for j in range(4)],
+        "lyricsFromParents": [],
+        "tags": [{"tag": {"id": t, "name": f"tag{t}"}, "count": t} for t in range(10)],
+    }
+
+
+PAYLOADS = {
+    'artist': lambda: _artist(1),
+    'album': lambda: _album(1, 24),
+    'song': lambda: _song(1),
+}
+
+
+def _time(fn, body, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(body)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def run(rounds):
+    """
+    Time each decoder backend on a synthetic `/details` payload of every entity type.
+
+    Returns:
+        A list of `(kind, size, method, microseconds per decode)` rows.
+    """
+    rows = []
+    for kind, payload in PAYLOADS.items():
+        body = json.dumps(payload()).encode()
+        for backend in available_backends():
+            decode = _decoder(backend)
+            rows.append((kind, len(body), f'{backend} -> model',
+                         _time(lambda b: MODELS[kind].from_json(decode(b)), body, rounds)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JSON decoding per entity type.")
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args(argv)
+    print(f"{'kind':<8}{'bytes':>8}  {'method':<20}{'us/decode':>10}")
+    for kind, size, method, micros in run(args.rounds):
+        print(f"{kind:<8}{size:>8}  {method:<20}{micros:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
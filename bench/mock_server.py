@@ -0,0 +1,301 @@
+# mock_server.py
+import sys
+import os
+
+# Add the src and project root directories to sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.extend([ROOT, os.path.join(ROOT, 'src')])
+
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass
+from aiohttp import web
+
+WIKITEXT_ROW = "|-\n| 歌詞の行 {n} || kashi no gyou {n} || lyrics line {n}\n"
+
+
+@dataclass(slots=True)
+class MockSettings:
+    """
+    Knobs of the stand-in TouhouDB/TouhouWiki server.
+
+    Attributes:
+        - `latency`: Base delay in seconds added to every response.
+        - `jitter`: Extra uniformly random delay in seconds.
+        - `error_rate`: Probability of answering with a retryable 429/500/503.
+        - `circles`: Number of circles in the `api/artists` listing.
+        - `albums_per_circle`: Size of every circle's album listing.
+        - `tracks_per_album`: Number of tracks on every album.
+        - `padding`: Bytes of filler description added to every details payload.
+        - `lyrics_lines`: Number of table rows in every lyrics page.
+        - `fixtures`: Optional directory of recorded responses, served in place of
+          generated ones. A request for `api/albums/12/details` is answered with
+          `<fixtures>/api/albums/12/details.json` when that file exists.
+        - `seed`: Seed of the random generator driving jitter and errors.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    circles: int = 100
+    albums_per_circle: int = 20
+    tracks_per_album: int = 12
+    padding: int = 0
+    lyrics_lines: int = 20
+    fixtures: str = None
+    seed: int = 0
+
+
+def _picture(kind, entity_id):
+    return {"mime": "image/jpeg", "urlOriginal": f"/img/{kind}/{entity_id}.jpg", "urlThumb": f"/img/{kind}/{entity_id}t.jpg"}
+
+
+class MockTouhouServer:
+    """
+    Local aiohttp stand-in for the TouhouDB API and the TouhouWiki `api.php`.
+
+    Payloads are generated deterministically from entity IDs (circle `c` owns
+    albums `c * 1000 + 1 ...`, album `a` holds songs `a * 100 + 1 ...`) unless
+    a recorded fixture exists. `GET /_stats` reports requests served and
+    distinct client connections seen; `POST /_reset` clears them.
+    """
+    def __init__(self, settings=None):
+        self.settings = settings or MockSettings()
+        self.random = random.Random(self.settings.seed)
+        self.requests = 0
+        self.errors = 0
+        self.connections = set()
+
+    def app(self):
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get('/_stats', self._stats)
+        app.router.add_post('/_reset', self._reset)
+        app.router.add_get('/api/artists', self._artists)
+        app.router.add_get(r'/api/artists/{id:\d+}', self._artist)
+        app.router.add_get(r'/api/artists/{id:\d+}/details', self._artist)
+        app.router.add_get('/api/albums', self._albums)
+        app.router.add_get(r'/api/albums/{id:\d+}', self._album_light)
+        app.router.add_get(r'/api/albums/{id:\d+}/details', self._album_details)
+        app.router.add_get('/api/songs', self._songs)
+        app.router.add_get(r'/api/songs/{id:\d+}', self._song_light)
+        app.router.add_get(r'/api/songs/{id:\d+}/details', self._song_details)
+        app.router.add_get('/api.php', self._wiki)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        if request.path.startswith('/_'):
+            return await handler(request)
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info('peername'))
+        settings = self.settings
+        delay = settings.latency + (self.random.uniform(0, settings.jitter) if settings.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        if settings.error_rate and self.random.random() < settings.error_rate:
+            self.errors += 1
+            return web.Response(status=self.random.choice((429, 500, 503)), text="injected error")
+        fixture = self._fixture(request.path)
+        if fixture is not None:
+            return web.Response(body=fixture, content_type='application/json')
+        return await handler(request)
+
+    def _fixture(self, path):
+        if not self.settings.fixtures:
+            return None
+        file_path = os.path.join(self.settings.fixtures, path.strip('/') + '.json')
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    async def _stats(self, request):
+        return web.json_response({
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections": len(self.connections),
+        })
+
+    async def _reset(self, request):
+        self.requests = 0
+        self.errors = 0
+        self.connections.clear()
+        return web.json_response({})
+
+    # ---- payload builders ----
+
+    def artist(self, artist_id):
+        return {
+            "id": artist_id, "name": f"Circle {artist_id}", "defaultName": f"Circle {artist_id}",
+            "defaultNameLanguage": "Japanese", "additionalNames": f"サークル{artist_id}",
+            "artistType": "Circle", "status": "Finished", "version": 1,
+            "mainPicture": _picture('artist', artist_id),
+            "description": "x" * self.settings.padding,
+        }
+
+    def album_summary(self, album_id):
+        return {
+            "id": album_id, "name": f"Album {album_id}", "defaultName": f"Album {album_id}",
+            "additionalNames": f"アルバム{album_id}", "artistString": f"Circle {album_id // 1000}",
+            "discType": "Album", "status": "Finished", "version": 1,
+            "releaseDate": {"year": 2019, "month": 12, "day": 30, "isEmpty": False},
+            "releaseEvent": {"id": 99, "name": "Comiket 97"},
+            "mainPicture": _picture('album', album_id),
+        }
+
+    def song(self, song_id):
+        return {
+            "id": song_id, "name": f"Song {song_id}", "defaultName": f"Song {song_id}",
+            "additionalNames": f"曲{song_id}", "songType": "Arrangement",
+            "artistString": f"Circle {song_id // 100000}", "originalVersionId": song_id % 500 + 1,
+            "lengthSeconds": 240, "version": 1,
+        }
+
+    def _tracks(self, album_id):
+        return [
+            {"discNumber": 1, "trackNumber": n, "name": f"Song {album_id * 100 + n}",
+             "song": self.song(album_id * 100 + n)}
+            for n in range(1, self.settings.tracks_per_album + 1)
+        ]
+
+    def _credits(self, artist_id):
+        return [{"artist": {"id": artist_id, "name": f"Circle {artist_id}"}, "categories": "Circle", "roles": "Default"}]
+
+    # ---- handlers ----
+
+    async def _artists(self, request):
+        query = request.query.get('query') or request.query.get('name')
+        if query:
+            digits = ''.join(c for c in query if c.isdigit())
+            artist_id = int(digits) if digits else sum(map(ord, query)) % 997 + 1
+            return web.json_response({"items": [self.artist(artist_id)], "totalCount": 1})
+        start = int(request.query.get('start', 0))
+        count = int(request.query.get('maxResults', 10))
+        total = self.settings.circles
+        items = [self.artist(i) for i in range(start + 1, min(start + count, total) + 1)]
+        return web.json_response({"items": items, "totalCount": total})
+
+    async def _artist(self, request):
+        return web.json_response(self.artist(int(request.match_info['id'])))
+
+    async def _albums(self, request):
+        query = request.query.get('query')
+        if query:
+            digits = ''.join(c for c in query if c.isdigit())
+            album_id = int(digits) if digits else 1001
+            return web.json_response({"items": [self.album_summary(album_id)], "totalCount": 1})
+        artist_id = int(request.query.get('artistId[]', 1))
+        start = int(request.query.get('start', 0))
+        count = int(request.query.get('maxResults', 50))
+        total = self.settings.albums_per_circle
+        items = [self.album_summary(artist_id * 1000 + i) for i in range(start + 1, min(start + count, total) + 1)]
+        return web.json_response({"items": items, "totalCount": total})
+
+    async def _album_light(self, request):
+        album_id = int(request.match_info['id'])
+        fields = request.query.get('fields', '')
+        data = self.album_summary(album_id)
+        if 'Tracks' in fields:
+            data['tracks'] = self._tracks(album_id)
+        if 'Artists' in fields:
+            data['artists'] = self._credits(album_id // 1000)
+        return web.json_response(data)
+
+    async def _album_details(self, request):
+        album_id = int(request.match_info['id'])
+        data = self.album_summary(album_id)
+        data['releaseDate']['formatted'] = "2019-12-30"
+        data.update({
+            "songs": self._tracks(album_id),
+            "artists": self._credits(album_id // 1000),
+            "tags": [{"tag": {"id": t, "name": f"tag{t}"}, "count": t} for t in range(10)],
+            "description": "x" * self.settings.padding,
+        })
+        return web.json_response(data)
+
+    async def _songs(self, request):
+        query = request.query.get('query', '')
+        digits = ''.join(c for c in query if c.isdigit())
+        song_id = int(digits) if digits else 100101
+        return web.json_response({"items": [self.song(song_id)], "totalCount": 1})
+
+    async def _song_light(self, request):
+        song_id = int(request.match_info['id'])
+        fields = request.query.get('fields', '')
+        data = self.song(song_id)
+        if 'Albums' in fields:
+            data['albums'] = [self.album_summary(song_id // 100)]
+        if 'Artists' in fields:
+            data['artists'] = self._credits(song_id // 100000)
+        return web.json_response(data)
+
+    async def _song_details(self, request):
+        song_id = int(request.match_info['id'])
+        return web.json_response({
+            "song": self.song(song_id),
+            "albums": [self.album_summary(song_id // 100)],
+            "artists": self._credits(song_id // 100000),
+            "tags": [{"tag": {"id": t, "name": f"tag{t}"}, "count": t} for t in range(10)],
+            "description": "x" * self.settings.padding,
+        })
+
+    def _wikitext(self):
+        rows = ''.join(WIKITEXT_ROW.format(n=n) for n in range(self.settings.lyrics_lines))
+        return "{| class=\"wikitable\"\n" + rows + "|}"
+
+    async def _wiki(self, request):
+        if request.query.get('action') == 'query':
+            titles = request.query.get('titles', '').split('|')
+            pages = [
+                {"pageid": n, "title": title, "revisions": [{"revid": 1000 + n, "slots": {"main": {"content": self._wikitext()}}}]}
+                for n, title in enumerate(titles)
+            ]
+            return web.json_response({"query": {"pages": pages}})
+        page = request.query.get('page', '')
+        return web.json_response({"parse": {"title": page, "revid": 1, "wikitext": self._wikitext()}})
+
+
+async def serve(settings, host='127.0.0.1', port=8765):
+    """
+    Start the mock server and return its `web.AppRunner`; call `cleanup()` to stop it.
+    """
+    runner = web.AppRunner(MockTouhouServer(settings).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def settings_arguments(parser):
+    """
+    Add the `MockSettings` options to an argument parser.
+    """
+    parser.add_argument('--latency', type=float, default=0.0, help="Base response delay in seconds.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random delay in seconds.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429/500/503.")
+    parser.add_argument('--circles', type=int, default=100, help="Circles in the artist listing.")
+    parser.add_argument('--albums', type=int, default=20, help="Albums per circle.")
+    parser.add_argument('--tracks', type=int, default=12, help="Tracks per album.")
+    parser.add_argument('--padding', type=int, default=0, help="Filler bytes per details payload.")
+    parser.add_argument('--fixtures', help="Directory of recorded JSON responses.")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def settings_from(args):
+    return MockSettings(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, circles=args.circles,
+        albums_per_circle=args.albums, tracks_per_album=args.tracks, padding=args.padding,
+        fixtures=args.fixtures, seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for TouhouDB and TouhouWiki.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    settings_arguments(parser)
+    args = parser.parse_args(argv)
+    web.run_app(MockTouhouServer(settings_from(args)).app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
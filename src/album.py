@@ -1,22 +1,31 @@
 # album.py
 import asyncio
-import aiohttp
+import logging
+from dataclasses import dataclass, field
 from urls import TDB_USAGE_URL
-from circle import Circle, CircleIdentifier
-import json
-
+from projection import MODEL_FIELDS, plan, load_projected, invalidate
+from circle import Circle
+from client import TouhouClient
+from util.general import AlbumConfig
+from util.concurrency import bounded_gather
+from util.lru import AsyncLRU, not_error
+from util.text import normalize_name
+from util.logs import get_logger
+
+logger = get_logger('album')
+
+@dataclass(slots=True)
 class AlbumIdentifier:
     """
     Helper class to store the identifier (ID and name) of a Touhou music album.
+
+    Each `Album` owns its own instance, so concurrent crawls do not share state.
     """
-    CIRCLE_NAME = CircleIdentifier.ARTIST_NAME
-    CIRCLE_ID = CircleIdentifier.ARTIST_ID
-    ALBUM_NAME = None
-    ALBUM_ID = None
-    ALBUM_LIST = {
-        'album name': ALBUM_NAME,
-        'album ID': ALBUM_ID
-    }
+    CIRCLE_NAME: str = None
+    CIRCLE_ID: int = None
+    ALBUM_NAME: str = None
+    ALBUM_ID: int = None
+    ALBUM_LIST: dict = field(default_factory=dict)
 class Album:
     """
     Main class for interacting with the TDB API to fetch details about Touhou music albums.
@@ -24,10 +33,20 @@ class Album:
     Attributes:
         - `circle_instance`: An instance of the `Circle` class.
         - `album_identifier`: An instance of `AlbumIdentifier` to store the current album's identifier.
+        - `config`: The `AlbumConfig` controlling detail fetch concurrency.
+        - `client`: The shared `TouhouClient`; defaults to the one owned by `circle_instance`.
+        - `store`: Optional `CatalogueStore`; defaults to the one owned by `circle_instance`.
+        - `index`: Optional offline `SearchIndex`; defaults to the one owned by `circle_instance`.
     """
-    def __init__(self, circle_instance):
+    def __init__(self, circle_instance, config=None, client=None, store=None, index=None):
         self.circle_instance = circle_instance
-        self.album_identifier = AlbumIdentifier
+        self.album_identifier = AlbumIdentifier()
+        self.config = config or AlbumConfig()
+        self.client = client or circle_instance.client
+        self.store = store if store is not None else circle_instance.store
+        self.index = index if index is not None else circle_instance.index
+        self._details_cache = AsyncLRU(self.config.CACHE_SIZE, self.config.CACHE_TTL)
+        self._id_cache = AsyncLRU(self.config.CACHE_SIZE, self.config.CACHE_TTL)
 
     async def _search_album_by_circle(self, artist_identifier, **kwargs):
         """
@@ -78,19 +97,35 @@ class Album:
         Returns:
             A dictionary containing details about the album.
         """
+        album_id = await self._id_cache.get_or_load(
+            normalize_name(album_name), lambda: self._resolve_album_id(album_name), not_error
+        )
+        if isinstance(album_id, dict):
+            return album_id
+        self.album_identifier.ALBUM_NAME = album_name
+        self.album_identifier.ALBUM_ID = album_id
+        return await self._album_details(album_id, **kwargs)
+
+    async def _resolve_album_id(self, album_name):
+        """
+        Resolve an album name to the ID of the first TouhouDB search result.
+
+        Returns:
+            The album ID, or an error dictionary.
+        """
+        if self.index is not None:
+            album_id = self.index.best(album_name, 'album')
+            if album_id is not None:
+                return album_id
         album_search_url = TDB_USAGE_URL.search_album_id_by_name(album_name)
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(album_search_url, headers=TDB_USAGE_URL.HEADERS)
-            if response.status == 200:
-                data = await response.json()
-                albums = data.get('items', [])
-                if albums:
-                    album_id = albums[0]['id']
-                    return await self._album_details(album_id, **kwargs)
-                else:
-                    return {"error": f"No album found for {album_name}"}
-            else:
-                return {"error": f"Failed to fetch album details. Status code: {response.status}"}
+        status, data = await self.client.get_json(album_search_url, headers=TDB_USAGE_URL.HEADERS)
+        if data is None:
+            return {"error": f"Failed to fetch album details. Status code: {status}"}
+        albums = data.get('items', [])
+        if albums:
+            return albums[0]['id']
+        else:
+            return {"error": f"No album found for {album_name}"}
 
     async def _album_details_by_id(self, album_id, **kwargs):
         """
@@ -116,7 +151,7 @@ class Album:
         Returns:
             A dictionary containing details about the albums.
         """
-        artist_details = await self.circle_instance._circle_details_by_name_or_id(artist_identifier, **kwargs)
+        artist_details = await self.circle_instance._circle_details_by_name_or_id(artist_identifier)
 
         if artist_details:
             artist_id = artist_details.get('id')
@@ -128,24 +163,115 @@ class Album:
         else:
             return {"error": f"Failed to fetch artist details for {artist_identifier}"}
 
-    async def _album_list(self, artist_id, **kwargs):
+    async def _album_list(self, artist_id, fields=None, **kwargs):
         """
         Fetch a list of Touhou music albums associated with a specific circle.
 
+        Every page of the listing is fetched, so circles with more albums than
+        `AlbumConfig.PAGE_SIZE` are no longer truncated.
+
         Args:
             - `artist_id`: The ID of the circle.
+            - `fields`: Optional `/details` keys to fetch for each album.
             - `kwargs`: Additional parameters for the search.
 
         Returns:
-            A dictionary containing details about the albums.
+            A dictionary containing details about the albums. Album details are
+            fetched concurrently and stored under `details` in the same order as
+            `items`; failed fetches are collected under `errors` keyed by album ID.
+        """
+        pages = {}
+        total_count = 0
+        async for start, page in self._iter_album_pages(artist_id):
+            if 'error' in page:
+                if start == 0:
+                    return page
+                logger.warning("skipping album page: %s", page['error'], extra={'artist_id': artist_id, 'start': start})
+                continue
+            pages[start] = page.get('items', [])
+            total_count = page.get('totalCount', total_count)
+
+        items = [album for start in sorted(pages) for album in pages[start]]
+        if logger.isEnabledFor(logging.DEBUG):
+            for album in items:
+                logger.debug("album listed", extra={'album_id': album.get('id'), 'title': album.get('defaultName')})
+
+        data = {"items": items, "totalCount": total_count}
+        data['details'], data['errors'] = await self._album_details_many([album.get('id') for album in items], fields)
+        return data
+
+    async def iter_albums(self, artist_id, revalidate=False):
+        """
+        Stream every album of a circle, following TouhouDB pagination.
+
+        The first page reveals the total count; the remaining pages are then
+        prefetched concurrently (at most `AlbumConfig.PREFETCH_PAGES` in flight)
+        and their albums are yielded as each page arrives, so callers can start
+        processing while later pages are still downloading.
+
+        Args:
+            - `artist_id`: The ID of the circle.
+            - `revalidate`: Revalidate cached listing pages with TouhouDB instead of
+              serving them from the response cache.
+
+        Yields:
+            Album dictionaries from the list endpoint. A page that fails to load
+            yields a single `{"error": ...}` dictionary instead.
+        """
+        async for start, page in self._iter_album_pages(artist_id, revalidate):
+            if 'error' in page:
+                yield page
+                continue
+            for album in page.get('items', []):
+                yield album
+
+    async def _iter_album_pages(self, artist_id, revalidate=False):
+        """
+        Yield `(start, page)` tuples for every page of a circle's album listing.
+        """
+        page_size = self.config.PAGE_SIZE
+        first = await self._album_page(artist_id, 0, revalidate)
+        yield 0, first
+        if 'error' in first:
+            return
+
+        starts = iter(range(page_size, first.get('totalCount', 0), page_size))
+        pending = {}
+        try:
+            while True:
+                while len(pending) < self.config.PREFETCH_PAGES:
+                    start = next(starts, None)
+                    if start is None:
+                        break
+                    pending[asyncio.ensure_future(self._album_page(artist_id, start, revalidate))] = start
+                if not pending:
+                    break
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield pending.pop(task), task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _album_page(self, artist_id, start, revalidate=False):
+        """
+        Fetch one page of a circle's album listing.
+
+        Args:
+            - `artist_id`: The ID of the circle.
+            - `start`: Offset of the first album on the page.
+            - `revalidate`: Revalidate a cached page instead of serving it as fresh.
+
+        Returns:
+            The decoded page, or an error dictionary.
         """
         url_instance = TDB_USAGE_URL()
         album_list_url = f'{url_instance.URL}api/albums?'
 
         params = {
-            "start": "0",
+            "start": str(start),
             "getTotalCount": "True",
-            "maxResults": "20",
+            "maxResults": str(self.config.PAGE_SIZE),
             "query": "",
             "fields": "AdditionalNames,MainPicture,ReleaseEvent",
             "lang": "Default",
@@ -160,50 +286,123 @@ class Album:
         if artist_id is not None:
             album_list_url += f'&artistId[]={artist_id}'
 
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(album_list_url, params=params, headers=TDB_USAGE_URL.HEADERS)
+        status, data = await self.client.get_json(album_list_url, params=params, headers=TDB_USAGE_URL.HEADERS, revalidate=revalidate)
+
+        if data is None:
+            return {"error": f"Failed to fetch album list page at {start}. Status code: {status}"}
+        return data
 
-            if response.status == 200:
-                data = await response.json()
+    async def _album_details_many(self, album_ids, fields=None, revalidate=False):
+        """
+        Fetch details for several albums concurrently, bounded by `AlbumConfig.MAX_CONCURRENCY`.
 
-                for album in data.get('items', []):
-                    print(f"  Album Title: {album.get('defaultName')}")
-                    print(f"  Album ID: {album.get('id')}")
-                    await self._album_details(album.get('id'))
+        Args:
+            - `album_ids`: The IDs of the albums.
+            - `fields`: Optional `/details` keys to fetch, as for `_album_details`.
+            - `revalidate`: Refetch instead of using cached details, as for `_album_details`.
 
-                return data
+        Returns:
+            A `(details, errors)` tuple. `details` holds one entry per album ID in
+            input order (None for failures); `errors` maps failed album IDs to a message.
+        """
+        results = await bounded_gather(
+            (self._album_details(album_id, fields, revalidate=revalidate) for album_id in album_ids),
+            self.config.MAX_CONCURRENCY,
+        )
+        details, errors = [], {}
+        for album_id, result in zip(album_ids, results):
+            if isinstance(result, Exception):
+                errors[album_id] = f"{type(result).__name__}: {result}"
+                details.append(None)
+            elif 'error' in result:
+                errors[album_id] = result['error']
+                details.append(None)
             else:
-                return {"error": f"Failed to fetch album details. Status code: {response.status}"}
+                details.append(result)
+        return details, errors
 
-    async def _album_details(self, album_id):
+    async def _album_details(self, album_id, fields=None, revalidate=False, **kwargs):
         """
         Fetch details about a specific Touhou music album.
 
         Args:
             - `album_id`: The ID of the album.
+            - `fields`: Optional `/details` keys to fetch (e.g. `("name", "songs")`);
+              the lighter `api/albums/{id}` endpoint is used when it covers them.
+            - `revalidate`: Drop the memoized details and revalidate any cached
+              response with TouhouDB, e.g. when the album is known to have changed.
 
         Returns:
-            A dictionary containing details about the album.
+            A dictionary containing details about the album. Successful lookups are
+            memoized in an in-process LRU sized by `AlbumConfig.CACHE_SIZE`.
         """
-        album_details_url= TDB_USAGE_URL.get_album_details(album_id)
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(album_details_url, headers=TDB_USAGE_URL.HEADERS)
-            if response.status == 200 and 'Content-Type' in response.headers and 'application/json' in response.headers['Content-Type']:
-                detailed_info = await response.json()
-                print(json.dumps(detailed_info, ensure_ascii=False, indent=4))
-                return detailed_info
-            else:
-                print(f"Failed to fetch album details. Status code: {response.status}")
-                return {"error": f"Failed to fetch album details. Status code: {response.status}"}
+        if revalidate:
+            invalidate(self._details_cache, album_id)
+        return await load_projected(
+            self._details_cache, album_id, fields,
+            lambda fields: self._fetch_album_details(album_id, fields, revalidate),
+        )
+
+    async def _fetch_album_details(self, album_id, fields=None, revalidate=False):
+        url, params, normalize = plan('album', album_id, fields)
+        status, detailed_info = await self.client.get_json(url, params=params, headers=TDB_USAGE_URL.HEADERS,
+                                                           revalidate=revalidate)
+        if detailed_info is None:
+            logger.warning("failed to fetch album details", extra={'album_id': album_id, 'status': status})
+            return {"error": f"Failed to fetch album details. Status code: {status}"}
+        return normalize(detailed_info)
+
+#///////////////////////////local store//////////////////////////////////////////////////////////////////////////
+    async def albums_by_circle(self, artist_id):
+        """
+        List a circle's albums from the local store, crawling TouhouDB on a miss.
+
+        Args:
+            - `artist_id`: The ID of the circle.
+
+        Returns:
+            A list of stored album rows, or an error dictionary.
+        """
+        if self.store is None:
+            return {"error": "No catalogue store attached"}
+        albums = self.store.albums_by_artist(artist_id)
+        if albums:
+            return albums
+
+        data = await self._album_list(artist_id, fields=MODEL_FIELDS['album'])
+        if 'error' in data:
+            return data
+        for details in data['details']:
+            if details is not None:
+                self.store.add_sync('album', details)
+        self.store.flush()
+        return self.store.albums_by_artist(artist_id)
+
+    def albums_by_event(self, event_name):
+        """
+        List the stored albums released at an event (e.g. "Comiket 99").
+        """
+        if self.store is None:
+            return {"error": "No catalogue store attached"}
+        return self.store.albums_by_event(event_name)
+
+    def album_tracks(self, album_id):
+        """
+        List the stored tracks of an album in disc/track order.
+        """
+        if self.store is None:
+            return {"error": "No catalogue store attached"}
+        return self.store.album_tracks(album_id)
 
 #//////////////////////////////////////end of Main Method Scrap////////////////////////////////////////////////////////////////////////////////////////
 async def test_album_details():
-    circle_instance = Circle()
-    album_instance = Album(circle_instance)
     album_name = 4468  # Replace with the album name you want to search
     artist_identifier='Foreground Eclipse'
 
-    album_details = await album_instance._search_album_by_circle(artist_identifier)
+    async with TouhouClient() as client:
+        circle_instance = Circle(client=client)
+        album_instance = Album(circle_instance)
+        album_details = await album_instance._search_album_by_circle(artist_identifier)
 
 if __name__ == "__main__":
     asyncio.run(test_album_details())
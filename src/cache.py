@@ -0,0 +1,132 @@
+# cache.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlencode
+from urls import endpoint_of
+from util.general import CacheConfig
+
+
+class CacheEntry:
+    """
+    A cached response body with its validators.
+    """
+    __slots__ = ('body', 'etag', 'last_modified', 'stored_at', 'ttl')
+
+    def __init__(self, body, etag, last_modified, stored_at, ttl):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.ttl = ttl
+
+    @property
+    def fresh(self):
+        return time.time() - self.stored_at < self.ttl
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache for TouhouDB and TouhouWiki JSON responses.
+
+    Bodies are stored zlib-compressed in a SQLite file together with their ETag
+    and Last-Modified validators. Entries younger than the TTL configured for
+    their endpoint in `CacheConfig.TTLS` are served without touching the
+    network; older ones are revalidated with a conditional request.
+
+    Attributes:
+        - `config`: The `CacheConfig` holding the database path and TTLs.
+        - `stats`: Counters for `hits`, `stale`, `misses`, `revalidated` and `stores`.
+    """
+    def __init__(self, config=None):
+        self.config = config or CacheConfig()
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0, 'revalidated': 0, 'stores': 0}
+        self._db = sqlite3.connect(self.config.PATH)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' endpoint TEXT NOT NULL,'
+            ' body BLOB NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' stored_at REAL NOT NULL)'
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(url, params=None):
+        """
+        Build the cache key for a request from its URL and sorted query parameters.
+        """
+        if not params:
+            return url
+        return f"{url}|{urlencode(sorted((k, str(v)) for k, v in params.items()))}"
+
+    def ttl_for(self, url):
+        return self.config.TTLS.get(endpoint_of(url), self.config.DEFAULT_TTL)
+
+    def get(self, url, params=None):
+        """
+        Look up a cached response.
+
+        Returns:
+            A `CacheEntry`, or None when the request has never been cached.
+        """
+        row = self._db.execute(
+            'SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?',
+            (self.key(url, params),),
+        ).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        body, etag, last_modified, stored_at = row
+        entry = CacheEntry(zlib.decompress(body), etag, last_modified, stored_at, self.ttl_for(url))
+        self.stats['hits' if entry.fresh else 'stale'] += 1
+        return entry
+
+    def put(self, url, params, body, etag=None, last_modified=None):
+        """
+        Store a response body and its validators.
+        """
+        self._db.execute(
+            'INSERT OR REPLACE INTO responses (key, endpoint, body, etag, last_modified, stored_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (self.key(url, params), endpoint_of(url), zlib.compress(body), etag, last_modified, time.time()),
+        )
+        self._db.commit()
+        self.stats['stores'] += 1
+
+    def touch(self, url, params=None):
+        """
+        Mark a stale entry as fresh again after a 304 Not Modified.
+        """
+        self._db.execute(
+            'UPDATE responses SET stored_at = ? WHERE key = ?',
+            (time.time(), self.key(url, params)),
+        )
+        self._db.commit()
+        self.stats['revalidated'] += 1
+
+    def clear(self, endpoint=None):
+        if endpoint is None:
+            self._db.execute('DELETE FROM responses')
+        else:
+            self._db.execute('DELETE FROM responses WHERE endpoint = ?', (endpoint,))
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
@@ -7,20 +7,35 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 
 
-import aiohttp
 import asyncio
 import json
+from dataclasses import dataclass
 from urls import TDB_USAGE_URL
+from projection import MODEL_FIELDS, plan, load_projected
+from client import TouhouClient
 from util.general import CircleConfig
+from util.lru import AsyncLRU, not_error
+from util.concurrency import resolve_many
+from util.text import normalize_name
 
+@dataclass(slots=True)
 class CircleIdentifier:
-    ARTIST_ID = None
-    ARTIST_NAME = None
+    """
+    Per-instance record of the circle most recently resolved by a `Circle`.
+    """
+    ARTIST_ID: int = None
+    ARTIST_NAME: str = None
 
 class Circle:
-    def __init__(self, config=None):
+    def __init__(self, config=None, client=None, store=None, index=None):
         self.circle_identifier = CircleIdentifier()
         self.config = config or CircleConfig()
+        self.client = client or TouhouClient()
+        self.store = store
+        self.index = index
+        self.album_list = {}
+        self._details_cache = AsyncLRU(self.config.CACHE_SIZE, self.config.CACHE_TTL)
+        self._id_cache = AsyncLRU(self.config.CACHE_SIZE, self.config.CACHE_TTL)
 
     async def _circle_details_by_name_or_id(self, identifier, **kwargs):
         if isinstance(identifier, int):
@@ -29,6 +44,33 @@ class Circle:
             return await self.search_by_name(identifier, **kwargs)
 
     async def search_by_name(self, artist_name, **kwargs):
+        artist_id = await self._id_cache.get_or_load(
+            normalize_name(artist_name), lambda: self._resolve_artist_id(artist_name), not_error
+        )
+        if isinstance(artist_id, dict):
+            return artist_id
+        self.circle_identifier.ARTIST_NAME = artist_name
+        self.circle_identifier.ARTIST_ID = artist_id
+        return await self.search_by_id(artist_id, **kwargs)
+
+    async def resolve_many(self, names):
+        """
+        Resolve many circle names to their artist details in one batch.
+
+        Names are normalized and deduplicated so each distinct circle costs one
+        search and one details call, with at most `CircleConfig.RESOLVE_CONCURRENCY`
+        lookups in flight.
+
+        Returns:
+            A dictionary mapping every input name to its artist details or an error dictionary.
+        """
+        return await resolve_many(names, self.search_by_name, self.config.RESOLVE_CONCURRENCY, normalize_name)
+
+    async def _resolve_artist_id(self, artist_name):
+        if self.index is not None:
+            artist_id = self.index.best(artist_name, 'artist')
+            if artist_id is not None:
+                return artist_id
         url = TDB_USAGE_URL.search_artist_id_by_name(artist_name)
         params = {
             'query': artist_name,
@@ -38,38 +80,73 @@ class Circle:
             'maxResults': str(self.config.MAX_RESULTS),
             'getTotalCount': str(self.config.GET_TOTAL_COUNT),
         }
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(url, params=params, headers=TDB_USAGE_URL.HEADERS)
-            if response.status == 200:
-                data = await response.json()
-                items = data.get('items', [])
-                if items:
-                    artist_id = items[0]['id']
-                    self.circle_identifier.ARTIST_NAME = artist_name
-                    self.circle_identifier.ARTIST_ID = artist_id
-                    return await self.search_by_id(artist_id)
-            return response
-
-    async def search_by_id(self, artist_id=None):
+        status, data = await self.client.get_json(url, params=params, headers=TDB_USAGE_URL.HEADERS)
+        if data is None:
+            return {"error": f"Failed to search artist. Status code: {status}"}
+        items = data.get('items', [])
+        if items:
+            return items[0]['id']
+        return {"error": f"No circle found for {artist_name}"}
+
+    async def search_by_id(self, artist_id=None, fields=None, **kwargs):
+        """
+        Fetch a circle's TouhouDB details.
+
+        Args:
+            - `artist_id`: The ID of the circle.
+            - `fields`: Optional `/details` keys to fetch (see `projection.plan`);
+              the lighter `api/artists/{id}` endpoint is used when it covers them.
+        """
         if artist_id is None:
             raise ValueError("artist_id is required")
 
-        url = TDB_USAGE_URL.get_artist_details(artist_id)
+        return await load_projected(
+            self._details_cache, artist_id, fields, lambda fields: self._fetch_artist_details(artist_id, fields)
+        )
 
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(url, headers=TDB_USAGE_URL.HEADERS)
-            if response.status == 200 and 'Content-Type' in response.headers and 'application/json' in response.headers['Content-Type']:
-                return await response.json()
+    async def _fetch_artist_details(self, artist_id, fields=None):
+        url, params, normalize = plan('artist', artist_id, fields)
+
+        status, data = await self.client.get_json(url, params=params, headers=TDB_USAGE_URL.HEADERS)
+        if data is None:
+            # Handle non-JSON responses, e.g., HTML error page
+            return {"error": f"Failed to fetch artist details. Status code: {status}"}
+        return normalize(data)
+
+    async def get_circle(self, identifier):
+        """
+        Look up a circle in the local store first, falling back to TouhouDB.
+
+        Args:
+            - `identifier`: The name or ID of the circle.
+
+        Returns:
+            The stored artist row, the TouhouDB details when no store is attached,
+            or an error dictionary.
+        """
+        if self.store is not None:
+            if isinstance(identifier, int):
+                row = self.store.artist_by_id(identifier)
             else:
-                # Handle non-JSON responses, e.g., HTML error page
-                return {"error": f"Failed to fetch artist details. Status code: {response.status}"}
+                row = self.store.artist_by_name(identifier)
+            if row is not None:
+                return row
+
+        fields = MODEL_FIELDS['artist'] if self.store is not None else None
+        details = await self._circle_details_by_name_or_id(identifier, fields=fields)
+        if 'error' in details or self.store is None:
+            return details
+        self.store.add_sync('artist', details)
+        self.store.flush()
+        return self.store.artist_by_id(details['id'])
 
 async def test_circle_details():
     circle_config = CircleConfig()
-    circle_instance = Circle(config=circle_config)
     circle_name = "FELT"  # Replace with the circle name you want to search
 
-    circle_details = await circle_instance._circle_details_by_name_or_id(circle_name)
+    async with TouhouClient() as client:
+        circle_instance = Circle(config=circle_config, client=client)
+        circle_details = await circle_instance._circle_details_by_name_or_id(circle_name)
     print("Circle Details:", json.dumps(circle_details, ensure_ascii=False, indent=4))
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+# client.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import aiohttp
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from decoding import decode
+from metrics import trace_config
+from ratelimit import TokenBucket, backoff_delay, retry_after_seconds
+from urls import endpoint_of
+from util.general import ClientConfig
+from util.logs import get_logger
+
+logger = get_logger('client')
+
+
+class TouhouClient:
+    """
+    Shared HTTP client for TouhouDB and TouhouWiki.
+
+    Owns one pooled `aiohttp.ClientSession` per host so that every request to the
+    same site reuses keep-alive connections instead of paying a fresh TCP+TLS
+    handshake. Use it as an async context manager and pass it to `Circle`,
+    `Album` and `Songs`.
+
+    Every request goes through a per-host `TokenBucket` and is retried with
+    jittered exponential backoff on throttling, server errors and connection
+    failures, honoring `Retry-After`.
+
+    Attributes:
+        - `config`: The `ClientConfig` holding pool limits, DNS cache TTL and timeouts.
+        - `cache`: Optional `ResponseCache` consulted before every request.
+        - `metrics`: Optional `Metrics` registry; when set, every session is traced
+          and body download and JSON decode are timed per endpoint.
+    """
+    def __init__(self, config=None, cache=None, metrics=None):
+        self.config = config or ClientConfig()
+        self.cache = cache
+        self.metrics = metrics
+        self._trace_configs = [trace_config(metrics)] if metrics is not None else None
+        self._sessions = {}
+        self._buckets = {}
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _new_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.config.LIMIT,
+            limit_per_host=self.config.LIMIT_PER_HOST,
+            ttl_dns_cache=self.config.DNS_CACHE_TTL,
+            keepalive_timeout=self.config.KEEPALIVE_TIMEOUT,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.config.TIMEOUT)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=self._trace_configs)
+
+    async def session_for(self, url):
+        """
+        Return the pooled session for the host of `url`, creating it on first use.
+
+        Args:
+            - `url`: Any URL on the target host.
+
+        Returns:
+            The `aiohttp.ClientSession` dedicated to that host.
+        """
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            async with self._lock:
+                session = self._sessions.get(host)
+                if session is None or session.closed:
+                    session = self._new_session()
+                    self._sessions[host] = session
+        return session
+
+    def bucket_for(self, url):
+        """
+        Return the rate limiter shared by every request to the host of `url`.
+        """
+        host = urlsplit(url).hostname or ''
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate = self.config.RATE_LIMITS.get(host, self.config.DEFAULT_RATE_LIMIT)
+            bucket = self._buckets[host] = TokenBucket(rate, self.config.BURST)
+        return bucket
+
+    def _pace(self, bucket, status):
+        """
+        Slow a host's bucket on throttling, final attempts included, and speed it
+        up only on responses that need no retry.
+        """
+        if status in (429, 503):
+            bucket.penalize()
+        elif status not in self.config.RETRY_STATUSES:
+            bucket.reward()
+
+    async def get_json(self, url, params=None, headers=None, revalidate=False):
+        """
+        Perform a GET request and decode a JSON body.
+
+        When a `cache` is attached, fresh entries are returned without a request
+        and stale ones are revalidated with If-None-Match / If-Modified-Since.
+
+        Args:
+            - `url`: The URL to fetch.
+            - `params`: Optional query parameters.
+            - `headers`: Optional request headers.
+            - `revalidate`: Revalidate a cached entry with the server even while
+              it is fresh, for callers that know the resource changed.
+
+        Returns:
+            A `(status, data)` tuple. `data` is None when the response is not a
+            successful JSON response.
+        """
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.get(url, params)
+            if entry is not None:
+                if entry.fresh and not revalidate:
+                    return 200, self._decode(entry.body, url)
+                headers = {**(headers or {}), **entry.conditional_headers()}
+
+        session = await self.session_for(url)
+        bucket = self.bucket_for(url)
+        max_retries = self.config.MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            await bucket.acquire()
+            try:
+                async with session.get(url, params=params, headers=headers) as response:
+                    status = response.status
+                    if status in self.config.RETRY_STATUSES and attempt < max_retries:
+                        self._pace(bucket, status)
+                        retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                        logger.info("retrying %s after status %s", url, status, extra={'attempt': attempt + 1})
+                    else:
+                        self._pace(bucket, status)
+                        if status == 304 and entry is not None:
+                            self.cache.touch(url, params)
+                            return 200, self._decode(entry.body, url)
+                        if status == 200 and 'application/json' in response.headers.get('Content-Type', ''):
+                            body = await self._read(response, url)
+                            if self.cache is not None:
+                                self.cache.put(url, params, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                            return status, self._decode(body, url)
+                        return status, None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                if attempt == max_retries:
+                    raise
+                retry_after = None
+                logger.info("retrying %s after %s", url, type(exc).__name__, extra={'attempt': attempt + 1})
+            if self.metrics is not None:
+                self.metrics.retries.inc(endpoint=endpoint_of(url))
+            await asyncio.sleep(backoff_delay(attempt, self.config.BACKOFF_BASE, self.config.BACKOFF_MAX, retry_after))
+
+    @asynccontextmanager
+    async def stream(self, url, headers=None):
+        """
+        Open a GET response for streaming its body, e.g. a picture.
+
+        Connecting and the response status are retried like `get_json`; the
+        body itself is left to the caller and is not retried.
+
+        Yields:
+            The final `aiohttp.ClientResponse`, whatever its status.
+        """
+        session = await self.session_for(url)
+        bucket = self.bucket_for(url)
+        max_retries = self.config.MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            await bucket.acquire()
+            try:
+                response = await session.get(url, headers=headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                if attempt == max_retries:
+                    raise
+                retry_after = None
+                logger.info("retrying %s after %s", url, type(exc).__name__, extra={'attempt': attempt + 1})
+            else:
+                status = response.status
+                if status in self.config.RETRY_STATUSES and attempt < max_retries:
+                    self._pace(bucket, status)
+                    retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                    response.release()
+                    logger.info("retrying %s after status %s", url, status, extra={'attempt': attempt + 1})
+                else:
+                    self._pace(bucket, status)
+                    try:
+                        yield response
+                    finally:
+                        response.release()
+                    return
+            if self.metrics is not None:
+                self.metrics.retries.inc(endpoint=endpoint_of(url))
+            await asyncio.sleep(backoff_delay(attempt, self.config.BACKOFF_BASE, self.config.BACKOFF_MAX, retry_after))
+
+    async def _read(self, response, url):
+        if self.metrics is None:
+            return await response.read()
+        with self.metrics.timer('download', endpoint_of(url)):
+            return await response.read()
+
+    def _decode(self, body, url):
+        if self.metrics is None:
+            return decode(body)
+        with self.metrics.timer('decode', endpoint_of(url)):
+            return decode(body)
+
+    async def close(self):
+        """
+        Close every pooled session and the attached cache.
+        """
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,341 @@
+# crawler.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import json
+import time
+from urls import TDB_USAGE_URL
+from projection import MODEL_FIELDS
+from circle import Circle
+from album import Album
+from song import Songs
+from client import TouhouClient
+from export import JsonlSink, default_export_path
+from images import ImageDownloader
+from metrics import Metrics
+from store import CatalogueStore
+from util.general import AlbumConfig, CrawlerConfig, ExportConfig, MetricsConfig, StoreConfig, TouhouAPI
+from util.logs import get_logger, setup_logging
+
+logger = get_logger('crawler')
+
+
+class CrawlState:
+    """
+    Checkpointed record of completed circles and albums.
+
+    Saved atomically as JSON so an interrupted crawl can resume where it stopped.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.circles = set()
+        self.albums = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.circles = set(data.get('circles', []))
+            self.albums = set(data.get('albums', []))
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'circles': sorted(self.circles), 'albums': sorted(self.albums)}, f)
+        os.replace(tmp_path, self.path)
+
+
+class Crawler:
+    """
+    Crawl circle -> albums -> songs -> lyrics with a pool of async workers.
+
+    Circles and albums are processed from one work queue by
+    `CrawlerConfig.WORKERS` workers. Completed circle and album IDs are
+    checkpointed to `CrawlerConfig.CHECKPOINT_PATH` every
+    `CrawlerConfig.CHECKPOINT_INTERVAL` seconds and on exit, and are skipped
+    when the crawl is restarted. With `CrawlerConfig.LEAN`, only the fields
+    the catalogue models read are requested from TouhouDB.
+
+    Attributes:
+        - `circle_instance`, `album_instance`, `songs_instance`: Shared API objects.
+        - `on_record`: Optional coroutine function called as `on_record(kind, record)`
+          for every fetched `artist`, `album`, `song` and `lyrics` record.
+        - `store`: Optional `CatalogueStore` every record is upserted into.
+        - `sink`: Optional open `JsonlSink` every record is written to; it is
+          flushed to disk before each checkpoint.
+        - `images`: Optional `ImageDownloader` fetching the pictures of every
+          `artist` and `album` record; its index is saved at each checkpoint.
+        - `state`: The `CrawlState` being checkpointed.
+        - `stats`: Counters of processed and failed items.
+    """
+    def __init__(self, client, config=None, on_record=None, store=None, sink=None, images=None):
+        self.config = config or CrawlerConfig()
+        self.client = client
+        self.store = store
+        self.sink = sink
+        self.images = images
+        self.circle_instance = Circle(client=client, store=store)
+        self.album_instance = Album(self.circle_instance)
+        self.songs_instance = Songs(self.album_instance)
+        self.on_record = on_record
+        self._fields = MODEL_FIELDS if self.config.LEAN else {}
+        self.state = CrawlState(self.config.CHECKPOINT_PATH)
+        self.stats = {'circles': 0, 'albums': 0, 'songs': 0, 'errors': 0}
+        self._queue = asyncio.Queue()
+        self._pending_albums = {}
+        self._failed_circles = set()
+        self._circle_slots = asyncio.Semaphore(self.config.MAX_PENDING_CIRCLES)
+        self._last_checkpoint = time.monotonic()
+
+    async def _emit(self, kind, record):
+        if self.store is not None:
+            self.store.add_sync(kind, record)
+        if self.sink is not None:
+            await self.sink.write(kind, record)
+        if self.images is not None and kind in ('artist', 'album'):
+            await self.images.download(kind, record)
+        if self.on_record is not None:
+            await self.on_record(kind, record)
+
+    async def crawl(self, circles=None):
+        """
+        Crawl the given circles, or the whole catalogue when `circles` is None.
+
+        Args:
+            - `circles`: Circle names or IDs.
+
+        Returns:
+            The `stats` dictionary.
+        """
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.config.WORKERS)]
+        try:
+            source = self.iter_catalogue() if circles is None else _aiter(circles)
+            async for identifier in source:
+                await self._circle_slots.acquire()
+                self._queue.put_nowait(('circle', identifier))
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self._checkpoint()
+        return self.stats
+
+    async def iter_catalogue(self):
+        """
+        Yield the ID of every circle in TouhouDB not yet completed, following pagination.
+        """
+        async for circle_id in iter_catalogue(self.client, skip=self.state.circles):
+            yield circle_id
+
+    async def _worker(self):
+        while True:
+            kind, payload = await self._queue.get()
+            try:
+                if kind == 'circle':
+                    await self._crawl_circle(payload)
+                else:
+                    await self._crawl_album(*payload)
+            except Exception as exc:
+                self.stats['errors'] += 1
+                logger.warning("failed to crawl %s %s: %s: %s", kind, payload, type(exc).__name__, exc)
+                if kind == 'circle':
+                    self._circle_slots.release()
+                else:
+                    self._failed_circles.add(payload[0])
+                    self._album_finished(payload[0])
+            finally:
+                self._queue.task_done()
+                await self._maybe_checkpoint()
+
+    async def _crawl_circle(self, identifier):
+        details = await self.circle_instance._circle_details_by_name_or_id(identifier, fields=self._fields.get('artist'))
+        if 'error' in details:
+            raise RuntimeError(details['error'])
+        circle_id = details['id']
+        if circle_id in self.state.circles or circle_id in self._pending_albums:
+            self._circle_slots.release()
+            return
+        await self._emit('artist', details)
+
+        self._pending_albums[circle_id] = 1
+        try:
+            async for album in self.album_instance.iter_albums(circle_id):
+                if 'error' in album:
+                    raise RuntimeError(album['error'])
+                if album['id'] not in self.state.albums:
+                    self._pending_albums[circle_id] += 1
+                    self._queue.put_nowait(('album', (circle_id, album['id'])))
+        except Exception as exc:
+            # An incomplete listing never completes the circle, but the circle
+            # is still released once the albums already queued finish.
+            self.stats['errors'] += 1
+            logger.warning("failed to list albums of circle %s: %s: %s", circle_id, type(exc).__name__, exc)
+            self._failed_circles.add(circle_id)
+        self._album_finished(circle_id)
+
+    async def _crawl_album(self, circle_id, album_id):
+        details = await self.album_instance._album_details(album_id, self._fields.get('album'))
+        if 'error' in details:
+            raise RuntimeError(details['error'])
+        await self._emit('album', details)
+
+        tracks = await self.songs_instance.song_list_by_album(
+            album_id, include_lyrics=self.config.INCLUDE_LYRICS, song_fields=self._fields.get('song')
+        )
+        complete = True
+        for track in tracks:
+            if track['details'] is None:
+                self.stats['errors'] += 1
+                complete = False
+                continue
+            await self._emit('song', track['details'])
+            if track['lyrics'] is not None:
+                await self._emit('lyrics', {**track['lyrics'], 'songId': track['id']})
+            self.stats['songs'] += 1
+
+        if complete:
+            self.state.albums.add(album_id)
+            self.stats['albums'] += 1
+        else:
+            # Left out of the checkpoint so a resumed crawl retries the failed tracks.
+            self._failed_circles.add(circle_id)
+        self._album_finished(circle_id)
+
+    def _album_finished(self, circle_id):
+        """
+        Count down a circle's outstanding albums and mark it done at zero.
+
+        Circles with a failed album are not marked done, so a resumed crawl
+        revisits them and retries only the missing albums.
+        """
+        self._pending_albums[circle_id] -= 1
+        if self._pending_albums[circle_id] == 0:
+            del self._pending_albums[circle_id]
+            if circle_id in self._failed_circles:
+                self._failed_circles.discard(circle_id)
+            else:
+                self.state.circles.add(circle_id)
+                self.stats['circles'] += 1
+            self._circle_slots.release()
+
+    async def _maybe_checkpoint(self):
+        if time.monotonic() - self._last_checkpoint >= self.config.CHECKPOINT_INTERVAL:
+            # Set first so workers finishing meanwhile do not checkpoint again.
+            self._last_checkpoint = time.monotonic()
+            await self._checkpoint()
+            if self.client.metrics is not None and MetricsConfig.PATH:
+                self.client.metrics.write()
+            logger.info("checkpoint", extra=self.stats)
+
+    async def _checkpoint(self):
+        # Flush first so the checkpoint never claims records the store or export do not hold yet.
+        if self.store is not None:
+            self.store.flush()
+        if self.sink is not None:
+            await self.sink.flush(durable=True)
+        if self.images is not None:
+            self.images.save_index()
+        self.state.save()
+
+
+async def iter_catalogue(client, skip=()):
+    """
+    Yield the ID of every circle in TouhouDB, following pagination.
+
+    Args:
+        - `client`: The `TouhouClient` used for the listing.
+        - `skip`: IDs to leave out, e.g. circles completed by a previous crawl.
+    """
+    start = 0
+    page_size = AlbumConfig.PAGE_SIZE
+    while True:
+        params = {
+            'artistTypes': 'Circle',
+            'start': str(start),
+            'maxResults': str(page_size),
+            'getTotalCount': 'True',
+            'sort': 'Name',
+        }
+        status, data = await client.get_json(TDB_USAGE_URL.list_artists(), params=params, headers=TDB_USAGE_URL.HEADERS)
+        if data is None:
+            raise RuntimeError(f"Failed to list artists at {start}. Status code: {status}")
+        for artist in data.get('items', []):
+            if artist['id'] not in skip:
+                yield artist['id']
+        start += page_size
+        if start >= data.get('totalCount', 0):
+            return
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl TouhouDB circles, albums, songs and lyrics.")
+    parser.add_argument('circles', nargs='*', help="Circle names or IDs. Crawls the whole catalogue when omitted.")
+    parser.add_argument('--workers', type=int, help="Number of concurrent workers.")
+    parser.add_argument('--shards', type=int, help="Number of worker processes to split the crawl across.")
+    parser.add_argument('--checkpoint', help="Path of the checkpoint file.")
+    parser.add_argument('--output', help="Path of the JSON Lines export.")
+    parser.add_argument('--compression', choices=['none', 'gzip', 'zstd'], help="Compression of the export.")
+    parser.add_argument('--store', help="Path of a SQLite catalogue store to upsert into.")
+    parser.add_argument('--lean', action='store_true', default=None,
+                        help="Only fetch the fields the catalogue store keeps.")
+    parser.add_argument('--metrics', help="Write Prometheus metrics to this file at every checkpoint and on exit.")
+    parser.add_argument('--openmetrics', action='store_true', default=None, help="Write metrics in OpenMetrics format.")
+    parser.add_argument('--log-level', help="Logging level, e.g. INFO or DEBUG.")
+    parser.add_argument('--log-json', action='store_true', default=None, help="Log JSON lines instead of text.")
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level, args.log_json)
+    MetricsConfig.configure(path=args.metrics, openmetrics=args.openmetrics)
+    CrawlerConfig.configure(workers=args.workers, checkpoint_path=args.checkpoint, lean=args.lean, shards=args.shards)
+
+    compression = ExportConfig.COMPRESSION if args.compression is None else args.compression
+    compression = None if compression == 'none' else compression
+    circles = [int(c) if c.isdigit() else c for c in args.circles] or None
+
+    if CrawlerConfig.SHARDS > 1:
+        # Imported here because sharding builds on this module.
+        from sharding import ShardedCrawler
+        if TouhouAPI.SAVE_IMAGE:
+            logger.warning("image downloads are not supported in sharded crawls; skipping them")
+        output = (args.output or default_export_path(compression)) if TouhouAPI.TO_JSON else None
+        stats = await ShardedCrawler().crawl(circles, output, compression, args.store, MetricsConfig.PATH)
+        print("Crawl finished:", stats)
+        return
+    metrics = Metrics() if MetricsConfig.PATH else None
+    async with TouhouClient(metrics=metrics) as client:
+        # A crawl resuming from its checkpoint adds to the export of the interrupted run.
+        resume = os.path.exists(CrawlerConfig.CHECKPOINT_PATH)
+        sink = JsonlSink(args.output or default_export_path(compression), compression, append=resume) \
+            if TouhouAPI.TO_JSON else None
+        images = ImageDownloader(client) if TouhouAPI.SAVE_IMAGE else None
+        store = None
+        if args.store:
+            StoreConfig.configure(path=args.store)
+            store = CatalogueStore()
+
+        if sink is not None:
+            await sink.open()
+        try:
+            stats = await Crawler(client, store=store, sink=sink, images=images).crawl(circles)
+        finally:
+            if store is not None:
+                store.close()
+            if sink is not None:
+                await sink.close()
+                print(f"Wrote {sink.count} records to {sink.path}")
+            if images is not None:
+                print("Images:", images.stats)
+            if metrics is not None:
+                metrics.write()
+    print("Crawl finished:", stats)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+# decoding.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+from util.general import DecoderConfig
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _decode_stdlib(body):
+    return json.loads(body)
+
+
+def _decoder(backend):
+    if backend == 'orjson' and orjson is not None:
+        return orjson.loads
+    if backend == 'msgspec' and msgspec is not None:
+        return msgspec.json.decode
+    if backend == 'json':
+        return _decode_stdlib
+    return None
+
+
+def available_backends():
+    return [name for name in ('orjson', 'msgspec', 'json') if _decoder(name) is not None]
+
+
+def select_backend(preferred=None):
+    """
+    Pick the JSON backend: `DecoderConfig.BACKEND` if installed, else the fastest available.
+    """
+    preferred = preferred or DecoderConfig.BACKEND
+    if preferred != 'auto' and _decoder(preferred) is not None:
+        return preferred
+    return available_backends()[0]
+
+
+# `(configured backend, decode function)`, resolved again only when `DecoderConfig.BACKEND` changes.
+_selected = (None, None)
+
+
+def decode(body):
+    """
+    Decode a JSON response body (bytes or str) with the selected backend.
+    """
+    global _selected
+    configured, function = _selected
+    if function is None or configured != DecoderConfig.BACKEND:
+        configured = DecoderConfig.BACKEND
+        function = _decoder(select_backend(configured))
+        _selected = (configured, function)
+    return function(body)
@@ -0,0 +1,149 @@
+# export.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import zlib
+import aiofiles
+from models import Artist, Album, Song, Lyrics
+from util.general import ExportConfig, TouhouAPI
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def normalize_artist(details):
+    return Artist.from_json(details).to_record()
+
+
+def normalize_album(details):
+    return Album.from_json(details).to_record()
+
+
+def normalize_song(details):
+    return Song.from_json(details).to_record()
+
+
+def normalize_lyrics(lyrics):
+    return Lyrics.from_json(lyrics).to_record()
+
+
+NORMALIZERS = {
+    'artist': normalize_artist,
+    'album': normalize_album,
+    'song': normalize_song,
+    'lyrics': normalize_lyrics,
+}
+
+
+class JsonlSink:
+    """
+    Streaming JSON Lines writer for crawled records.
+
+    Records are normalized, encoded one per line and written through
+    `aiofiles` in `ExportConfig.BUFFER_SIZE` chunks, so memory stays constant
+    regardless of catalogue size. Output can be gzip- or (when `zstandard` is
+    installed) zstd-compressed on the fly. With `append`, records are added to
+    an existing export, e.g. when a crawl resumes from its checkpoint; gzip
+    members and zstd frames appended this way still decompress as one stream.
+
+    Attributes:
+        - `path`: Destination file.
+        - `compression`: None, `'gzip'` or `'zstd'`.
+        - `append`: Add to an existing file instead of truncating it.
+        - `count`: Number of records written.
+    """
+    def __init__(self, path, compression=None, config=None, append=False):
+        self.path = path
+        self.compression = compression
+        self.append = append
+        self.config = config or ExportConfig()
+        self.count = 0
+        self._file = None
+        self._lock = asyncio.Lock()
+        self._buffer = []
+        self._buffered = 0
+        self._sync_flush = None
+        if compression is None:
+            self._compressor = None
+        elif compression == 'gzip':
+            self._compressor = zlib.compressobj(wbits=31)
+            self._sync_flush = zlib.Z_SYNC_FLUSH
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise ValueError("zstd compression requires the 'zstandard' package")
+            self._compressor = zstandard.ZstdCompressor().compressobj()
+            self._sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            raise ValueError(f"Unsupported compression: {compression}")
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        self._file = await aiofiles.open(self.path, 'ab' if self.append else 'wb')
+
+    async def write(self, kind, record):
+        """
+        Normalize and append one record.
+
+        Args:
+            - `kind`: One of `artist`, `album`, `song` or `lyrics`.
+            - `record`: The raw TouhouDB/TouhouWiki payload.
+        """
+        normalized = {'type': kind, **NORMALIZERS[kind](record)}
+        line = json.dumps(normalized, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.count += 1
+        if self._buffered >= self.config.BUFFER_SIZE:
+            await self.flush()
+
+    async def flush(self, durable=False):
+        """
+        Write the buffered lines.
+
+        Args:
+            - `durable`: Also flush the compressor and the file, so every record
+              written so far is on disk and readable, e.g. before a checkpoint.
+        """
+        # Serialized so concurrent flushes reach the file in compression order.
+        async with self._lock:
+            chunk = b''.join(self._buffer)
+            self._buffer.clear()
+            self._buffered = 0
+            if self._compressor is not None:
+                chunk = self._compressor.compress(chunk) if chunk else b''
+                if durable:
+                    chunk += self._compressor.flush(self._sync_flush)
+            if chunk:
+                await self._file.write(chunk)
+            if durable:
+                await self._file.flush()
+
+    async def close(self):
+        if self._file is None:
+            return
+        await self.flush()
+        if self._compressor is not None:
+            await self._file.write(self._compressor.flush())
+        await self._file.close()
+        self._file = None
+
+
+def default_export_path(compression=None):
+    """
+    Path of the catalogue export inside the `Artist Data` directory.
+    """
+    suffix = {None: '', 'gzip': '.gz', 'zstd': '.zst'}[compression]
+    return os.path.join(TouhouAPI.mkfile(), f'catalogue.jsonl{suffix}')
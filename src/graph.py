@@ -0,0 +1,341 @@
+# graph.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from collections import defaultdict
+from models import to_model
+from search_index import name_keys
+from store import CatalogueStore
+from util.general import GraphConfig, StoreConfig
+
+
+def _replace_edges(forward, reverse, key, targets):
+    """
+    Replace the outgoing edges of `key` in `forward`, keeping `reverse` in step.
+    """
+    for target in forward.pop(key, ()):
+        reverse[target].discard(key)
+    if targets:
+        forward[key] = set(targets)
+        for target in targets:
+            reverse[target].add(key)
+
+
+class SongGraph:
+    """
+    In-memory relationship graph of songs, their originals, albums and artists.
+
+    Holds arrangement→original edges (from TouhouDB's `originalVersionId`),
+    song→artist and album→artist credits, and album↔song membership, each with
+    its reverse adjacency, so queries walk sets instead of calling TouhouDB.
+    A circle is linked to a song when it is credited on the song or on an
+    album the song appears on, matching `CatalogueStore.songs_by_artist`.
+
+    The graph is updated incrementally with `add_record`: a song's original
+    link and credits are replaced when the song is seen again, while album
+    membership only grows. Partial (projected) records only update what they
+    carry.
+
+    Attributes:
+        - `config`: The `GraphConfig` holding the default artist type and result limit.
+        - `names`: Maps song IDs to their names.
+        - `song_types`: Maps song IDs to their TouhouDB song type.
+        - `artists`: Maps artist IDs to `(name, artist_type)` for artists seen as records.
+    """
+    def __init__(self, config=None):
+        self.config = config or GraphConfig()
+        self.names = {}
+        self.song_types = {}
+        self.artists = {}
+        self._original = {}
+        self._derived = defaultdict(set)
+        self._song_artists = {}
+        self._artist_songs = defaultdict(set)
+        self._album_artists = {}
+        self._artist_albums = defaultdict(set)
+        self._album_songs = defaultdict(set)
+        self._song_albums = defaultdict(set)
+        self._name_keys = defaultdict(set)
+
+    def __len__(self):
+        return len(self.names)
+
+    # ---- updates ----
+
+    def add_song(self, song_id, name=None, song_type=None, original_id=None, artist_ids=None, album_ids=None):
+        """
+        Add or update one song.
+
+        Args:
+            - `song_id`: The TouhouDB song ID.
+            - `name`: The song's name; indexed for `find`.
+            - `song_type`: TouhouDB song type, e.g. `Original` or `Arrangement`.
+            - `original_id`: ID of the song this one arranges, if any.
+            - `artist_ids`: Credited artist IDs; None leaves the current credits untouched.
+            - `album_ids`: IDs of albums the song appears on; added to the known ones.
+        """
+        if name:
+            if self.names.get(song_id) != name:
+                for key in name_keys(self.names.get(song_id) or ''):
+                    self._name_keys[key].discard(song_id)
+                for key in name_keys(name):
+                    self._name_keys[key].add(song_id)
+            self.names[song_id] = name
+        else:
+            self.names.setdefault(song_id, None)
+        if song_type:
+            self.song_types[song_id] = song_type
+        if original_id is not None or song_type == 'Original':
+            previous = self._original.pop(song_id, None)
+            if previous is not None:
+                self._derived[previous].discard(song_id)
+            if original_id is not None and original_id != song_id:
+                self._original[song_id] = original_id
+                self._derived[original_id].add(song_id)
+                self.names.setdefault(original_id, None)
+        if artist_ids is not None:
+            _replace_edges(self._song_artists, self._artist_songs, song_id, artist_ids)
+        for album_id in album_ids or ():
+            self._album_songs[album_id].add(song_id)
+            self._song_albums[song_id].add(album_id)
+
+    def add_album(self, album_id, song_ids=(), artist_ids=None):
+        """
+        Add an album's tracks and, when given, replace its credited artists.
+        """
+        for song_id in song_ids:
+            if song_id is None:
+                continue
+            self.names.setdefault(song_id, None)
+            self._album_songs[album_id].add(song_id)
+            self._song_albums[song_id].add(album_id)
+        if artist_ids is not None:
+            _replace_edges(self._album_artists, self._artist_albums, album_id, artist_ids)
+
+    def add_artist(self, artist_id, name=None, artist_type=None):
+        self.artists[artist_id] = (name, artist_type)
+
+    def add_record(self, kind, record):
+        """
+        Update the graph from a raw `artist`, `album` or `song` record or details payload.
+
+        Other kinds, such as `lyrics`, are ignored.
+        """
+        if kind == 'song':
+            model = to_model('song', record)
+            if model.id is None:
+                return
+            original_id = model.original_version_id
+            if original_id is None:
+                original_id = (record.get('originalVersion') or {}).get('id')
+            self.add_song(
+                model.id, model.name, model.song_type, original_id,
+                artist_ids=model.artist_ids if 'artists' in record else None,
+                album_ids=model.album_ids,
+            )
+        elif kind == 'album':
+            model = to_model('album', record)
+            if model.id is None:
+                return
+            self.add_album(
+                model.id, [track.song_id for track in model.tracks],
+                artist_ids=model.artist_ids if 'artists' in record else None,
+            )
+        elif kind == 'artist':
+            model = to_model('artist', record)
+            if model.id is not None:
+                self.add_artist(model.id, model.name, model.artist_type)
+
+    @classmethod
+    def from_store(cls, store, config=None):
+        """
+        Build a graph from every artist, song, credit and track row of a `CatalogueStore`.
+        """
+        graph = cls(config)
+        db = store._db
+        for row in db.execute('SELECT id, name, artist_type FROM artists'):
+            graph.add_artist(row['id'], row['name'], row['artist_type'])
+        song_artists = defaultdict(list)
+        for row in db.execute('SELECT song_id, artist_id FROM song_artists'):
+            song_artists[row['song_id']].append(row['artist_id'])
+        for row in db.execute('SELECT id, name, song_type, original_version_id FROM songs'):
+            graph.add_song(row['id'], row['name'], row['song_type'], row['original_version_id'],
+                           artist_ids=song_artists.get(row['id'], ()))
+        album_artists = defaultdict(list)
+        for row in db.execute('SELECT album_id, artist_id FROM album_artists'):
+            album_artists[row['album_id']].append(row['artist_id'])
+        album_songs = defaultdict(list)
+        for row in db.execute('SELECT album_id, song_id FROM tracks WHERE song_id IS NOT NULL'):
+            album_songs[row['album_id']].append(row['song_id'])
+        for album_id in set(album_artists) | set(album_songs):
+            graph.add_album(album_id, album_songs.get(album_id, ()), album_artists.get(album_id, ()))
+        return graph
+
+    # ---- queries ----
+
+    def find(self, name):
+        """
+        Return the IDs of songs whose name matches `name` exactly (normalized, kana-folded).
+        """
+        found = set()
+        for key in name_keys(name):
+            found |= self._name_keys.get(key, set())
+        return sorted(found)
+
+    def original_of(self, song_id):
+        """
+        Follow arrangement links up to the original tune; a song without one is its own original.
+        """
+        seen = {song_id}
+        while song_id in self._original:
+            song_id = self._original[song_id]
+            if song_id in seen:
+                break
+            seen.add(song_id)
+        return song_id
+
+    def arrangements(self, song_id, transitive=True):
+        """
+        Return the IDs of songs arranging `song_id`, including arrangements of arrangements.
+
+        Args:
+            - `song_id`: The original (or any song) to start from.
+            - `transitive`: Also follow arrangements of the direct arrangements.
+        """
+        if not transitive:
+            return sorted(self._derived.get(song_id, ()))
+        found, pending = set(), [song_id]
+        while pending:
+            for derived in self._derived.get(pending.pop(), ()):
+                if derived not in found and derived != song_id:
+                    found.add(derived)
+                    pending.append(derived)
+        return sorted(found)
+
+    def circles_of(self, song_id, artist_type=None):
+        """
+        Return the IDs of artists credited on a song or on an album it appears on.
+
+        Args:
+            - `artist_type`: Keep only artists of this type (default `GraphConfig.ARTIST_TYPE`);
+              artists never seen as a record have no known type and are kept.
+        """
+        artist_type = artist_type or self.config.ARTIST_TYPE
+        artists = set(self._song_artists.get(song_id, ()))
+        for album_id in self._song_albums.get(song_id, ()):
+            artists |= self._album_artists.get(album_id, set())
+        return {
+            artist_id for artist_id in artists
+            if artist_id not in self.artists or self.artists[artist_id][1] in (None, artist_type)
+        }
+
+    def songs_of(self, artist_id):
+        """
+        Return the IDs of songs credited to an artist or appearing on its albums.
+        """
+        songs = set(self._artist_songs.get(artist_id, ()))
+        for album_id in self._artist_albums.get(artist_id, ()):
+            songs |= self._album_songs.get(album_id, set())
+        return sorted(songs)
+
+    def songs_on_album(self, album_id):
+        return sorted(self._album_songs.get(album_id, ()))
+
+    def arrangements_by_circle(self, song_id, artist_type=None):
+        """
+        Group every arrangement of `song_id` by the circles behind it.
+
+        Returns:
+            A dictionary mapping circle IDs to sorted lists of arrangement IDs.
+        """
+        grouped = defaultdict(list)
+        for derived in self.arrangements(song_id):
+            for artist_id in self.circles_of(derived, artist_type):
+                grouped[artist_id].append(derived)
+        return dict(grouped)
+
+    def top_arrangers(self, originals, limit=None, artist_type=None):
+        """
+        Rank circles by how many of the given original tunes they arranged.
+
+        Args:
+            - `originals`: Song IDs of the original tunes, e.g. `songs_on_album` of a game soundtrack.
+            - `limit`: Maximum number of circles (default `GraphConfig.TOP_LIMIT`).
+            - `artist_type`: Artist type counted as a circle (default `GraphConfig.ARTIST_TYPE`).
+
+        Returns:
+            A list of `{"artist_id", "name", "tunes", "arrangements"}` dictionaries,
+            most distinct tunes first, then most arrangements.
+        """
+        tunes = defaultdict(set)
+        arrangements = defaultdict(set)
+        for original in set(originals):
+            for derived in self.arrangements(original):
+                for artist_id in self.circles_of(derived, artist_type):
+                    tunes[artist_id].add(original)
+                    arrangements[artist_id].add(derived)
+        ranked = sorted(tunes, key=lambda artist_id: (-len(tunes[artist_id]), -len(arrangements[artist_id]), artist_id))
+        return [
+            {
+                "artist_id": artist_id,
+                "name": self.artists.get(artist_id, (None, None))[0],
+                "tunes": len(tunes[artist_id]),
+                "arrangements": len(arrangements[artist_id]),
+            }
+            for artist_id in ranked[:limit or self.config.TOP_LIMIT]
+        ]
+
+    def top_arrangers_of_album(self, album_id, limit=None, artist_type=None):
+        """
+        Rank circles by how many tunes of an album (e.g. a game soundtrack) they arranged.
+        """
+        originals = [song_id for song_id in self.songs_on_album(album_id) if song_id not in self._original]
+        return self.top_arrangers(originals, limit, artist_type)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query arrangement relationships in a catalogue store.")
+    parser.add_argument('--store', help="Path of the catalogue store.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    arrangements = commands.add_parser('arrangements', help="List the arrangements of a song by circle.")
+    arrangements.add_argument('song', help="Song ID or exact name.")
+    arrangers = commands.add_parser('arrangers', help="Rank circles arranging the tunes of an album.")
+    arrangers.add_argument('album_id', type=int)
+    arrangers.add_argument('--limit', type=int)
+    args = parser.parse_args(argv)
+
+    if args.store:
+        StoreConfig.configure(path=args.store)
+    store = CatalogueStore()
+    try:
+        start = time.perf_counter()
+        graph = SongGraph.from_store(store)
+        built = time.perf_counter() - start
+    finally:
+        store.close()
+
+    start = time.perf_counter()
+    if args.command == 'arrangements':
+        song_ids = [int(args.song)] if args.song.isdigit() else graph.find(args.song)
+        if not song_ids:
+            print(f"No song found for {args.song}")
+            return
+        for song_id in song_ids:
+            print(f"{song_id} {graph.names.get(song_id)}")
+            for artist_id, derived in sorted(graph.arrangements_by_circle(song_id).items()):
+                name = graph.artists.get(artist_id, (None, None))[0]
+                print(f"  {artist_id} {name}: {', '.join(str(d) for d in derived)}")
+    else:
+        for row in graph.top_arrangers_of_album(args.album_id, args.limit):
+            print(f"{row['artist_id']} {row['name']}: {row['tunes']} tunes, {row['arrangements']} arrangements")
+    print(f"Built graph of {len(graph)} songs in {built * 1000:.1f}ms; "
+          f"query took {(time.perf_counter() - start) * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
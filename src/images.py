@@ -0,0 +1,144 @@
+# images.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import hashlib
+import json
+import aiofiles
+from urllib.parse import urljoin, urlsplit
+from urls import TDB_USAGE_URL
+from util.general import ImageConfig, TouhouAPI
+from util.lru import AsyncLRU
+from util.logs import get_logger
+
+logger = get_logger('images')
+
+# TouhouDB `mainPicture` fields for each supported size.
+PICTURE_FIELDS = {
+    'original': 'urlOriginal',
+    'thumb': 'urlThumb',
+    'small': 'urlSmallThumb',
+    'tiny': 'urlTinyThumb',
+}
+
+
+class ImageDownloader:
+    """
+    Mirror artist and album pictures to disk.
+
+    Images are streamed in `ImageConfig.CHUNK_SIZE` chunks through `aiofiles`
+    while being hashed, then stored once under `images/<sha256><ext>` so covers
+    shared between entities are deduplicated. `index.json` maps every
+    `<kind>/<id>/<size>` key and source URL to its stored file; URLs already in
+    the index are skipped. Requests go through `TouhouClient.stream`, so they
+    share the client's rate limits and retries; a failed download leaves no
+    partial file.
+
+    Attributes:
+        - `client`: The shared `TouhouClient`.
+        - `directory`: Root directory, defaulting to `Artist Data`.
+        - `sizes`: Picture sizes to fetch (`original`, `thumb`, `small`, `tiny`).
+    """
+    def __init__(self, client, directory=None, sizes=None, config=None):
+        self.client = client
+        self.config = config or ImageConfig()
+        self.directory = TouhouAPI.mkfile(directory)
+        self.sizes = tuple(sizes or self.config.SIZES)
+        self.images_dir = TouhouAPI.mkfile(os.path.join(self.directory, 'images'))
+        self.index_path = os.path.join(self.directory, 'index.json')
+        self.stats = {'downloaded': 0, 'deduplicated': 0, 'skipped': 0, 'failed': 0}
+        self._semaphore = asyncio.Semaphore(self.config.MAX_CONCURRENCY)
+        self._downloads = AsyncLRU(max_size=4096)
+        self._index = {'entities': {}, 'urls': {}}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self._index = json.load(f)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.save_index()
+
+    async def download(self, kind, entity):
+        """
+        Download the configured picture sizes of an artist or album.
+
+        Args:
+            - `kind`: `artist` or `album`.
+            - `entity`: The TouhouDB payload carrying `mainPicture`.
+
+        Returns:
+            A dictionary mapping each size to its stored path, or None on failure.
+        """
+        picture = entity.get('mainPicture') or {}
+        tasks = {}
+        for size in self.sizes:
+            url = picture.get(PICTURE_FIELDS[size])
+            if url:
+                tasks[size] = self._fetch(urljoin(TDB_USAGE_URL.URL, url))
+        paths = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        for size, path in paths.items():
+            if path is not None:
+                self._index['entities'][f"{kind}/{entity.get('id')}/{size}"] = os.path.basename(path)
+        return paths
+
+    async def _fetch(self, url):
+        # Single-flight per URL so a cover shared by concurrent albums is fetched once.
+        return await self._downloads.get_or_load(url, lambda: self._fetch_once(url), lambda path: path is not None)
+
+    async def _fetch_once(self, url):
+        stored = self._index['urls'].get(url)
+        if stored and os.path.exists(os.path.join(self.images_dir, stored)):
+            self.stats['skipped'] += 1
+            return os.path.join(self.images_dir, stored)
+
+        async with self._semaphore:
+            try:
+                path = await self._stream_to_disk(url)
+            except Exception as exc:
+                self.stats['failed'] += 1
+                logger.warning("failed to download %s: %s: %s", url, type(exc).__name__, exc)
+                return None
+        if path is not None:
+            self._index['urls'][url] = os.path.basename(path)
+        return path
+
+    async def _stream_to_disk(self, url):
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(self.images_dir, f".{hashlib.md5(url.encode()).hexdigest()}.part")
+        try:
+            async with self.client.stream(url, headers=TDB_USAGE_URL.HEADERS) as response:
+                if response.status != 200:
+                    self.stats['failed'] += 1
+                    logger.warning("failed to download %s", url, extra={'status': response.status})
+                    return None
+                async with aiofiles.open(tmp_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(self.config.CHUNK_SIZE):
+                        digest.update(chunk)
+                        await f.write(chunk)
+        except BaseException:
+            # Includes cancellation, so no partial file is left behind.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        extension = os.path.splitext(urlsplit(url).path)[1] or '.jpg'
+        path = os.path.join(self.images_dir, f"{digest.hexdigest()}{extension}")
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            self.stats['deduplicated'] += 1
+        else:
+            os.replace(tmp_path, path)
+            self.stats['downloaded'] += 1
+        return path
+
+    def save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
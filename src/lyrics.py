@@ -0,0 +1,149 @@
+# lyrics.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+import mwparserfromhell
+from util.general import LyricsConfig
+from util.lru import AsyncLRU
+
+LANGUAGES = ('original', 'romaji', 'english')
+
+# Header and template parameter names mapped to the language they hold.
+_LANGUAGE_ALIASES = {
+    'original': 'original', 'japanese': 'original', 'kanji': 'original', 'ja': 'original', 'jp': 'original',
+    'romaji': 'romaji', 'romanization': 'romaji', 'romanized': 'romaji', 'rom': 'romaji',
+    'english': 'english', 'translation': 'english', 'en': 'english', 'eng': 'english',
+}
+
+
+def _language_of(label):
+    return _LANGUAGE_ALIASES.get(label.strip().lower().split(' ')[0])
+
+
+def _cell_text(wikicode):
+    for tag in wikicode.filter_tags(matches=lambda node: node.tag == 'br'):
+        wikicode.replace(tag, '\n')
+    return wikicode.strip_code().strip()
+
+
+def _tag_filter(*names):
+    return lambda node: node.tag in names
+
+
+def iter_lines(wikitext):
+    """
+    Stream `(language, line)` pairs out of a TouhouWiki lyrics page.
+
+    Lyrics tables are read row by row; columns are mapped to languages from
+    the header cells when present and otherwise assumed to be original,
+    romaji, English. Templates carrying named `ja`/`romaji`/`en` style
+    parameters are handled as well.
+    """
+    code = mwparserfromhell.parse(wikitext)
+
+    for table in code.filter_tags(matches=_tag_filter('table')):
+        headers = [_language_of(_cell_text(th.contents)) for th in table.contents.filter_tags(matches=_tag_filter('th'))]
+        columns = headers if any(headers) else list(LANGUAGES)
+        # Cells before the first `|-` form an implicit first row.
+        rows = [table.contents.filter_tags(matches=_tag_filter('td'), recursive=False)]
+        for row in table.contents.filter_tags(matches=_tag_filter('tr'), recursive=False):
+            rows.append(row.contents.filter_tags(matches=_tag_filter('td'), recursive=False))
+        for cells in rows:
+            for language, cell in zip(columns, cells):
+                text = _cell_text(cell.contents)
+                if language and text:
+                    yield language, text
+
+    for template in code.filter_templates(recursive=False):
+        for param in template.params:
+            language = _language_of(str(param.name))
+            if language:
+                text = _cell_text(param.value)
+                if text:
+                    yield language, text
+
+
+def parse_wikitext(wikitext):
+    """
+    Parse a lyrics page into `{language: [lines]}`.
+
+    Module-level so it can run in a worker process.
+    """
+    lines = {language: [] for language in LANGUAGES}
+    for language, text in iter_lines(wikitext):
+        lines[language].append(text)
+    return lines
+
+
+class LyricsParser:
+    """
+    Turn TouhouWiki lyrics wikitext into structured per-language lines.
+
+    Parsing is CPU-bound, so it runs in a process pool instead of on the event
+    loop. Results are cached by `(title, revid)`, so a page is only reparsed
+    when its wiki revision changes.
+
+    Attributes:
+        - `config`: The `LyricsConfig` holding the pool size and cache size.
+        - `metrics`: Optional `Metrics` registry timing each parse (queueing included).
+    """
+    def __init__(self, config=None, metrics=None):
+        self.config = config or LyricsConfig()
+        self.metrics = metrics
+        self._cache = AsyncLRU(self.config.CACHE_SIZE)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.config.PROCESSES)
+        return self._pool
+
+    async def parse(self, title, revid, wikitext):
+        """
+        Parse one page, reusing the cached result for an unchanged revision.
+
+        Returns:
+            A dictionary with `title`, `revid` and `lines` (`{language: [lines]}`).
+        """
+        async def load():
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            lines = await loop.run_in_executor(self._executor(), parse_wikitext, wikitext)
+            if self.metrics is not None:
+                self.metrics.phase_seconds.observe(time.perf_counter() - start, phase='parse', endpoint='lyrics')
+            return {"title": title, "revid": revid, "lines": lines}
+
+        if revid is None:
+            return await load()
+        return await self._cache.get_or_load((title, revid), load)
+
+    async def parse_many(self, pages):
+        """
+        Parse many pages concurrently across the process pool.
+
+        Args:
+            - `pages`: Iterable of dictionaries with `title`, `revid` and `wikitext`.
+
+        Returns:
+            Parsed pages in input order.
+        """
+        return await asyncio.gather(*(
+            self.parse(page['title'], page.get('revid'), page['wikitext']) for page in pages
+        ))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,238 @@
+# metrics.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bisect
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+import aiohttp
+from urls import endpoint_of
+from util.general import MetricsConfig
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _render_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with one value per label set.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _labels(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_labels(labels), 0)
+
+    def samples(self, openmetrics):
+        for labels, value in self.values.items():
+            yield f"{self.name}_total{_render_labels(labels)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram with one series per label set.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=None):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets or MetricsConfig.BUCKETS)
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = _labels(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels):
+        series = self.series.get(_labels(labels))
+        return series[2] if series else 0
+
+    def quantile(self, q, **labels):
+        """
+        Estimate a quantile from the buckets (upper bound of the bucket holding it).
+        """
+        series = self.series.get(_labels(labels))
+        if not series or not series[2]:
+            return None
+        target = q * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), series[0]):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def samples(self, openmetrics):
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_render_labels(labels, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_sum{_render_labels(labels)} {_number(total)}"
+            yield f"{self.name}_count{_render_labels(labels)} {count}"
+
+
+class Metrics:
+    """
+    In-process registry of the crawl's counters and latency histograms.
+
+    Request phases are fed by the aiohttp `TraceConfig` from `trace_config`;
+    decode, body download and lyrics parsing are timed by `TouhouClient` and
+    `LyricsParser`. The registry renders as Prometheus text or OpenMetrics and
+    can be written to a file for a textfile collector.
+
+    Attributes:
+        - `requests`: Completed HTTP requests by `endpoint` and `status`.
+        - `request_errors`: Failed HTTP requests by `endpoint` and exception `error`.
+        - `retries`: Retried requests by `endpoint`.
+        - `connections`: Connections by `state` (`created` or `reused`).
+        - `request_seconds`: Request latency up to response headers, by `endpoint`.
+        - `phase_seconds`: Time spent per `phase` (`queued`, `dns`, `connect`,
+          `wait`, `download`, `decode`, `parse`), by `endpoint`.
+    """
+    def __init__(self, buckets=None):
+        self.requests = Counter('touhou_http_requests', "HTTP requests by endpoint and status.")
+        self.request_errors = Counter('touhou_http_request_errors', "HTTP requests that raised, by endpoint.")
+        self.retries = Counter('touhou_http_retries', "Retried HTTP requests by endpoint.")
+        self.connections = Counter('touhou_http_connections', "Connections created or reused from the pool.")
+        self.request_seconds = Histogram('touhou_http_request_seconds', "Request latency until response headers.", buckets)
+        self.phase_seconds = Histogram('touhou_phase_seconds', "Time spent per request or processing phase.", buckets)
+        self.families = [self.requests, self.request_errors, self.retries, self.connections,
+                         self.request_seconds, self.phase_seconds]
+
+    @contextmanager
+    def timer(self, phase, endpoint):
+        """
+        Time a block into `phase_seconds`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds.observe(time.perf_counter() - start, phase=phase, endpoint=endpoint)
+
+    def render(self, openmetrics=False):
+        """
+        Render every metric family as Prometheus text (0.0.4) or OpenMetrics.
+        """
+        lines = []
+        for family in self.families:
+            name = family.name if openmetrics or family.kind != 'counter' else f"{family.name}_total"
+            lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            lines.extend(family.samples(openmetrics))
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path=None, openmetrics=None):
+        """
+        Atomically write the rendered metrics to `path` (default `MetricsConfig.PATH`).
+        """
+        path = path or MetricsConfig.PATH
+        openmetrics = MetricsConfig.OPENMETRICS if openmetrics is None else openmetrics
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render(openmetrics))
+        os.replace(tmp_path, path)
+
+
+def trace_config(metrics):
+    """
+    Build an aiohttp `TraceConfig` feeding `metrics`.
+
+    Records pool wait, DNS resolution, connection setup (DNS, TCP connect and
+    TLS handshake together, as aiohttp reports them), server wait (headers sent
+    to response headers), and per-endpoint request counts and latency.
+    """
+    def context_factory(trace_request_ctx=None):
+        return SimpleNamespace(trace_request_ctx=trace_request_ctx, endpoint='search', marks={})
+
+    config = aiohttp.TraceConfig(trace_config_ctx_factory=context_factory)
+
+    def mark(name):
+        async def hook(session, ctx, params):
+            ctx.marks[name] = time.perf_counter()
+        return hook
+
+    def phase(name, start_mark):
+        async def hook(session, ctx, params):
+            start = ctx.marks.pop(start_mark, None)
+            if start is not None:
+                now = time.perf_counter()
+                metrics.phase_seconds.observe(now - start, phase=name, endpoint=ctx.endpoint)
+        return hook
+
+    async def on_request_start(session, ctx, params):
+        ctx.endpoint = endpoint_of(str(params.url))
+        ctx.marks['request'] = time.perf_counter()
+
+    async def on_request_headers_sent(session, ctx, params):
+        ctx.marks['sent'] = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        now = time.perf_counter()
+        metrics.requests.inc(endpoint=ctx.endpoint, status=params.response.status)
+        metrics.request_seconds.observe(now - ctx.marks['request'], endpoint=ctx.endpoint)
+        sent = ctx.marks.get('sent')
+        if sent is not None:
+            metrics.phase_seconds.observe(now - sent, phase='wait', endpoint=ctx.endpoint)
+
+    async def on_request_exception(session, ctx, params):
+        metrics.request_errors.inc(endpoint=ctx.endpoint, error=type(params.exception).__name__)
+
+    async def on_connection_create_end(session, ctx, params):
+        metrics.connections.inc(state='created')
+        await phase('connect', 'connect')(session, ctx, params)
+
+    async def on_connection_reuseconn(session, ctx, params):
+        metrics.connections.inc(state='reused')
+
+    config.on_request_start.append(on_request_start)
+    config.on_request_headers_sent.append(on_request_headers_sent)
+    config.on_request_end.append(on_request_end)
+    config.on_request_exception.append(on_request_exception)
+    config.on_connection_queued_start.append(mark('queued'))
+    config.on_connection_queued_end.append(phase('queued', 'queued'))
+    config.on_dns_resolvehost_start.append(mark('dns'))
+    config.on_dns_resolvehost_end.append(phase('dns', 'dns'))
+    config.on_connection_create_start.append(mark('connect'))
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_connection_reuseconn.append(on_connection_reuseconn)
+    return config
@@ -0,0 +1,200 @@
+# models.py
+from dataclasses import dataclass, field
+
+
+def _picture(data):
+    return (data.get('mainPicture') or {}).get('urlOriginal')
+
+
+def _artist_ids(data):
+    return tuple(
+        artist['artist']['id']
+        for artist in data.get('artists', [])
+        if (artist.get('artist') or {}).get('id') is not None
+    )
+
+
+@dataclass(slots=True)
+class Artist:
+    id: int
+    name: str = None
+    additional_names: str = None
+    artist_type: str = None
+    picture: str = None
+    version: int = None
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            id=data.get('id'),
+            name=data.get('name') or data.get('defaultName'),
+            additional_names=data.get('additionalNames'),
+            artist_type=data.get('artistType'),
+            picture=_picture(data),
+            version=data.get('version'),
+        )
+
+    def to_record(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'additionalNames': self.additional_names,
+            'artistType': self.artist_type,
+            'picture': self.picture,
+        }
+
+
+@dataclass(slots=True)
+class Track:
+    song_id: int
+    name: str = None
+    disc_number: int = None
+    track_number: int = None
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            song_id=(data.get('song') or {}).get('id'),
+            name=data.get('name'),
+            disc_number=data.get('discNumber'),
+            track_number=data.get('trackNumber'),
+        )
+
+    def to_record(self):
+        return {
+            'songId': self.song_id,
+            'name': self.name,
+            'discNumber': self.disc_number,
+            'trackNumber': self.track_number,
+        }
+
+
+@dataclass(slots=True)
+class Album:
+    id: int
+    name: str = None
+    additional_names: str = None
+    artist_string: str = None
+    release_date: str = None
+    release_event_id: int = None
+    release_event: str = None
+    picture: str = None
+    version: int = None
+    tracks: tuple = ()
+    artist_ids: tuple = ()
+
+    @classmethod
+    def from_json(cls, data):
+        release_event = data.get('releaseEvent') or {}
+        return cls(
+            id=data.get('id'),
+            name=data.get('name') or data.get('defaultName'),
+            additional_names=data.get('additionalNames'),
+            artist_string=data.get('artistString'),
+            release_date=(data.get('releaseDate') or {}).get('formatted'),
+            release_event_id=release_event.get('id'),
+            release_event=release_event.get('name'),
+            picture=_picture(data),
+            version=data.get('version'),
+            tracks=tuple(Track.from_json(track) for track in data.get('songs', [])),
+            artist_ids=_artist_ids(data),
+        )
+
+    def to_record(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'additionalNames': self.additional_names,
+            'artistString': self.artist_string,
+            'releaseDate': self.release_date,
+            'releaseEvent': self.release_event,
+            'picture': self.picture,
+            'tracks': [track.to_record() for track in self.tracks],
+        }
+
+
+@dataclass(slots=True)
+class Song:
+    id: int
+    name: str = None
+    additional_names: str = None
+    song_type: str = None
+    artist_string: str = None
+    original_version_id: int = None
+    version: int = None
+    album_ids: tuple = ()
+    artist_ids: tuple = ()
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Build a song from a `/songs/{id}/details` payload or a bare song contract.
+        """
+        song = data.get('song') if 'song' in data else data
+        song = song or {}
+        return cls(
+            id=song.get('id'),
+            name=song.get('defaultName') or song.get('name'),
+            additional_names=song.get('additionalNames') or data.get('additionalNames'),
+            song_type=song.get('songType'),
+            artist_string=song.get('artistString'),
+            original_version_id=song.get('originalVersionId'),
+            version=song.get('version'),
+            album_ids=tuple(album.get('id') for album in data.get('albums', [])),
+            artist_ids=_artist_ids(data),
+        )
+
+    def to_record(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'additionalNames': self.additional_names,
+            'songType': self.song_type,
+            'artistString': self.artist_string,
+            'originalVersionId': self.original_version_id,
+            'albums': list(self.album_ids),
+            'artists': list(self.artist_ids),
+        }
+
+
+@dataclass(slots=True)
+class Lyrics:
+    song_id: int
+    title: str = None
+    revid: int = None
+    wikitext: str = field(default=None, repr=False)
+    lines: dict = field(default=None, repr=False)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            song_id=data.get('songId'),
+            title=data.get('title'),
+            revid=data.get('revid'),
+            wikitext=data.get('wikitext'),
+            lines=data.get('lines'),
+        )
+
+    def to_record(self):
+        return {
+            'songId': self.song_id,
+            'title': self.title,
+            'revid': self.revid,
+            'wikitext': self.wikitext,
+            'lines': self.lines,
+        }
+
+
+MODELS = {
+    'artist': Artist,
+    'album': Album,
+    'song': Song,
+    'lyrics': Lyrics,
+}
+
+
+def to_model(kind, record):
+    """
+    Parse a raw crawled record of the given kind into its model.
+    """
+    return MODELS[kind].from_json(record)
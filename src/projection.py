@@ -0,0 +1,189 @@
+# projection.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from weakref import WeakKeyDictionary
+from urls import TDB_USAGE_URL
+from util.lru import not_error
+
+# Field selections each cache has loaded, to find cached payloads covering a new selection.
+_PROJECTIONS = WeakKeyDictionary()
+
+# Keys the lighter `api/{kind}/{id}` endpoints always return. Callers name
+# fields by the top-level keys of the matching `/details` response.
+BASE_FIELDS = {
+    'artist': {'id', 'name', 'defaultName', 'defaultNameLanguage', 'artistType', 'createDate',
+               'deleted', 'pictureMime', 'releaseDate', 'status', 'version'},
+    'album': {'id', 'name', 'defaultName', 'defaultNameLanguage', 'artistString', 'createDate',
+              'deleted', 'discType', 'ratingAverage', 'ratingCount', 'releaseDate', 'status', 'version'},
+    'song': {'song'},
+}
+
+# `/details` keys the lighter endpoints can add through TouhouDB's `fields=` parameter.
+OPTIONAL_FIELDS = {
+    'artist': {
+        'additionalNames': 'AdditionalNames',
+        'baseVoicebank': 'BaseVoicebank',
+        'description': 'Description',
+        'mainPicture': 'MainPicture',
+        'names': 'Names',
+        'tags': 'Tags',
+        'webLinks': 'WebLinks',
+    },
+    'album': {
+        'additionalNames': 'AdditionalNames',
+        'artists': 'Artists',
+        'description': 'Description',
+        'discs': 'Discs',
+        'identifiers': 'Identifiers',
+        'mainPicture': 'MainPicture',
+        'names': 'Names',
+        'pvs': 'PVs',
+        'releaseEvent': 'ReleaseEvent',
+        'songs': 'Tracks',
+        'tags': 'Tags',
+        'webLinks': 'WebLinks',
+    },
+    'song': {
+        'additionalNames': 'AdditionalNames',
+        'albums': 'Albums',
+        'artists': 'Artists',
+        'lyricsFromParents': 'Lyrics',
+        'pvs': 'PVs',
+        'tags': 'Tags',
+        'webLinks': 'WebLinks',
+    },
+}
+
+# The fields the catalogue models read, for jobs that only feed the store or the search index.
+MODEL_FIELDS = {
+    'artist': frozenset({'id', 'name', 'additionalNames', 'artistType', 'mainPicture', 'version'}),
+    'album': frozenset({'id', 'name', 'additionalNames', 'artistString', 'releaseDate', 'releaseEvent',
+                        'mainPicture', 'version', 'songs', 'artists'}),
+    'song': frozenset({'song', 'additionalNames', 'albums', 'artists'}),
+}
+
+_DETAILS_URLS = {
+    'artist': TDB_USAGE_URL.get_artist_details,
+    'album': TDB_USAGE_URL.get_album_details,
+    'song': TDB_USAGE_URL.get_song_details,
+}
+
+_ENTITY_URLS = {
+    'artist': TDB_USAGE_URL.get_artist,
+    'album': TDB_USAGE_URL.get_album,
+    'song': TDB_USAGE_URL.get_song,
+}
+
+
+def projection_key(fields):
+    """
+    Normalize a field selection into a hashable cache key; None means every field.
+    """
+    return None if fields is None else frozenset(fields)
+
+
+def plan(kind, entity_id, fields=None):
+    """
+    Choose the cheapest TouhouDB endpoint that returns every requested field.
+
+    Args:
+        - `kind`: `artist`, `album` or `song`.
+        - `entity_id`: The TouhouDB ID.
+        - `fields`: `/details` keys the caller needs, or None for the full payload.
+
+    Returns:
+        A `(url, params, normalize)` tuple. `normalize` turns the response into
+        the `/details` shape, so callers read the same keys either way.
+    """
+    if fields is None or not set(fields) <= BASE_FIELDS[kind] | set(OPTIONAL_FIELDS[kind]):
+        return _DETAILS_URLS[kind](entity_id), None, _identity
+    extra = sorted({OPTIONAL_FIELDS[kind][f] for f in fields if f in OPTIONAL_FIELDS[kind]})
+    params = {'lang': 'Default'}
+    if extra:
+        params['fields'] = ','.join(extra)
+    return _ENTITY_URLS[kind](entity_id), params, _NORMALIZERS[kind]
+
+
+async def load_projected(cache, entity_id, fields, load):
+    """
+    Memoize `load(fields)` in an `AsyncLRU`.
+
+    Full payloads are keyed by the bare ID and serve any later projection of
+    the same entity; projected payloads are trimmed to the requested keys, keyed
+    by `(id, fields)` and serve any later projection whose fields they cover.
+    """
+    if fields is None:
+        return await cache.get_or_load(entity_id, lambda: load(fields), not_error)
+    full = cache.get(entity_id)
+    if full is not None:
+        return full
+    wanted = projection_key(fields)
+    seen = _PROJECTIONS.setdefault(cache, set())
+    for cached_fields in seen:
+        if wanted <= cached_fields:
+            cached = cache.get((entity_id, cached_fields))
+            if cached is not None:
+                return cached
+    seen.add(wanted)
+    return await cache.get_or_load((entity_id, wanted), lambda: _project(load(fields), wanted), not_error)
+
+
+async def _project(pending, fields):
+    # Only the requested keys stay cached; the rest of the payload is dropped.
+    data = await pending
+    if not not_error(data):
+        return data
+    return {key: data[key] for key in fields if key in data}
+
+
+def invalidate(cache, entity_id):
+    """
+    Drop the full payload and every cached projection of an entity from an `AsyncLRU`.
+    """
+    cache.invalidate(entity_id)
+    for fields in _PROJECTIONS.get(cache, ()):
+        cache.invalidate((entity_id, fields))
+
+
+def _identity(data):
+    return data
+
+
+def _formatted_date(date):
+    if not date or date.get('isEmpty') or 'formatted' in date or not date.get('year'):
+        return date
+    parts = [f"{date['year']:04d}"] + [f"{date[k]:02d}" for k in ('month', 'day') if date.get(k)]
+    return {**date, 'formatted': '-'.join(parts)}
+
+
+def _normalize_album(data):
+    data = dict(data)
+    if 'tracks' in data:
+        data['songs'] = data.pop('tracks')
+    if 'releaseDate' in data:
+        data['releaseDate'] = _formatted_date(data['releaseDate'])
+    return data
+
+
+def _normalize_song(data):
+    song = dict(data)
+    details = {'song': song}
+    for key in ('albums', 'artists', 'pvs', 'tags', 'webLinks'):
+        if key in song:
+            details[key] = song.pop(key)
+    if 'lyrics' in song:
+        details['lyricsFromParents'] = song.pop('lyrics')
+    if 'additionalNames' in song:
+        details['additionalNames'] = song['additionalNames']
+    return details
+
+
+_NORMALIZERS = {
+    'artist': _identity,
+    'album': _normalize_album,
+    'song': _normalize_song,
+}
@@ -0,0 +1,83 @@
+# ratelimit.py
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """
+    Adaptive token-bucket rate limiter for a single host.
+
+    Tokens refill at `rate` per second up to `burst`. A throttling response
+    (429/503) halves the current rate, and every successful response nudges it
+    back towards the configured ceiling, so a crawl settles at the highest
+    throughput the server tolerates.
+
+    `burst` may be fractional, e.g. a share of the budget split between
+    processes. Below one token, a request waits for a full bucket and the
+    shortfall is borrowed from the next refill, so the rate still holds.
+    """
+    def __init__(self, rate, burst, min_rate=0.2):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """
+        Wait until a token is available and consume it.
+        """
+        async with self._lock:
+            self._refill()
+            needed = min(1, self.burst)
+            while self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def penalize(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+def retry_after_seconds(value):
+    """
+    Parse a Retry-After header given either as delta-seconds or an HTTP date.
+
+    Returns:
+        The delay in seconds, or None when the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """
+    Compute the delay before retry number `attempt` (starting at 0).
+
+    Uses full-jitter exponential backoff capped at `cap`, but never waits
+    less than a server-provided Retry-After, however long it is.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
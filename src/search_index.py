@@ -0,0 +1,229 @@
+# search_index.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bisect
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from models import to_model
+from util.general import SearchConfig
+from util.text import normalize_name, fold_kana, romanize, is_cjk
+
+_WORD = re.compile(r'\w+')
+
+# Relative weight of a term depending on where it came from.
+NAME_WEIGHT = 1.0
+ADDITIONAL_NAME_WEIGHT = 0.8
+LYRICS_WEIGHT = 0.2
+
+
+def _split_names(value):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value if v]
+    return [part.strip() for part in str(value).split(',') if part.strip()]
+
+
+def _compact(text):
+    return ''.join(_WORD.findall(text))
+
+
+def name_keys(name):
+    """
+    Whole-name lookup keys: the normalized name and its romanized form, without punctuation.
+    """
+    folded = fold_kana(normalize_name(name))
+    return {key for key in (_compact(folded), _compact(romanize(folded))) if key}
+
+
+def tokenize(text):
+    """
+    Split text into index terms.
+
+    Latin words are kept whole; kana is additionally romanized; runs of CJK
+    characters, which have no spaces, are indexed as the whole run plus
+    character bigrams.
+    """
+    folded = fold_kana(normalize_name(text))
+    terms = []
+    for word in _WORD.findall(folded):
+        terms.append(word)
+        roman = romanize(word)
+        if roman != word:
+            terms.append(roman)
+        run = ''.join(c for c in word if is_cjk(c))
+        if len(run) > 2:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Offline inverted index over artist, album and song names, additional names and lyrics.
+
+    Lookups are exact on whole names, then per-term exact, prefix and (when a
+    term matches nothing) trigram-based fuzzy matches, scored and ranked.
+    Katakana, hiragana and romaji spellings of the same name share terms.
+
+    Attributes:
+        - `config`: The `SearchConfig` holding fuzzy-match thresholds.
+        - `documents`: Maps `(kind, id)` to the display name of each document.
+    """
+    def __init__(self, config=None):
+        self.config = config or SearchConfig()
+        self.documents = {}
+        self._names = defaultdict(set)
+        self._postings = defaultdict(dict)
+        self._trigrams = defaultdict(set)
+        self._sorted_terms = []
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, kind, entity_id, name, additional_names=None, lyrics=None):
+        """
+        Index one document.
+
+        Args:
+            - `kind`: `artist`, `album` or `song`.
+            - `entity_id`: The TouhouDB ID.
+            - `name`: The default name.
+            - `additional_names`: Comma-separated string or list of alternative names.
+            - `lyrics`: Optional lyrics text.
+        """
+        key = (kind, entity_id)
+        if name:
+            self.documents.setdefault(key, name)
+        for weight, names in ((NAME_WEIGHT, [name] if name else []),
+                              (ADDITIONAL_NAME_WEIGHT, _split_names(additional_names))):
+            for value in names:
+                for name_key in name_keys(value):
+                    self._names[name_key].add(key)
+                for term in tokenize(value):
+                    self._add_term(term, key, weight)
+        if lyrics:
+            for term in set(tokenize(lyrics)):
+                self._add_term(term, key, LYRICS_WEIGHT)
+
+    def _add_term(self, term, key, weight):
+        postings = self._postings[term]
+        if not postings:
+            for trigram in _trigrams(term):
+                self._trigrams[trigram].add(term)
+            self._dirty = True
+        postings[key] = max(postings.get(key, 0), weight)
+
+    def add_record(self, kind, record):
+        """
+        Index a raw crawled `artist`, `album`, `song` or `lyrics` record.
+        """
+        model = to_model(kind, record)
+        if kind == 'lyrics':
+            self.add('song', model.song_id, None, lyrics=model.wikitext)
+        else:
+            self.add(kind, model.id, model.name, model.additional_names)
+
+    @classmethod
+    def from_store(cls, store, config=None):
+        """
+        Build an index from every artist, album, song and lyrics row of a `CatalogueStore`.
+        """
+        index = cls(config)
+        for table, kind in (('artists', 'artist'), ('albums', 'album'), ('songs', 'song')):
+            for row in store._db.execute(f'SELECT id, name, additional_names FROM {table}'):
+                index.add(kind, row['id'], row['name'], row['additional_names'])
+        for row in store._db.execute('SELECT song_id, wikitext FROM lyrics'):
+            index.add('song', row['song_id'], None, lyrics=row['wikitext'])
+        return index
+
+    def _terms(self):
+        if self._dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._dirty = False
+        return self._sorted_terms
+
+    def _prefix_matches(self, prefix):
+        terms = self._terms()
+        i = bisect.bisect_left(terms, prefix)
+        matches = []
+        while i < len(terms) and terms[i].startswith(prefix) and len(matches) < self.config.MAX_EXPANSIONS:
+            if terms[i] != prefix:
+                matches.append(terms[i])
+            i += 1
+        return matches
+
+    def _fuzzy_matches(self, term):
+        counts = defaultdict(int)
+        for trigram in _trigrams(term):
+            for candidate in self._trigrams.get(trigram, ()):
+                counts[candidate] += 1
+        ranked = sorted(counts, key=counts.get, reverse=True)[:self.config.MAX_EXPANSIONS * 4]
+        matches = []
+        for candidate in ranked:
+            ratio = SequenceMatcher(None, term, candidate).ratio()
+            if ratio >= self.config.FUZZY_THRESHOLD:
+                matches.append((candidate, ratio))
+        return matches
+
+    def search(self, query, kind=None, limit=10):
+        """
+        Rank documents matching `query`.
+
+        Args:
+            - `query`: Free-text query in any script.
+            - `kind`: Restrict results to `artist`, `album` or `song`.
+            - `limit`: Maximum number of results.
+
+        Returns:
+            A list of `{"kind", "id", "name", "score"}` dictionaries, best first.
+        """
+        scores = defaultdict(float)
+        for name_key in name_keys(query):
+            for key in self._names.get(name_key, ()):
+                scores[key] = max(scores[key], self.config.EXACT_NAME_SCORE)
+
+        for term in set(tokenize(query)):
+            matched = False
+            for key, weight in self._postings.get(term, {}).items():
+                scores[key] += weight
+                matched = True
+            for expansion in self._prefix_matches(term):
+                for key, weight in self._postings[expansion].items():
+                    scores[key] += weight * 0.6
+                    matched = True
+            if not matched:
+                for candidate, ratio in self._fuzzy_matches(term):
+                    for key, weight in self._postings[candidate].items():
+                        scores[key] += weight * 0.5 * ratio
+
+        ranked = sorted(
+            (item for item in scores.items() if kind is None or item[0][0] == kind),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return [
+            {"kind": key[0], "id": key[1], "name": self.documents.get(key), "score": score}
+            for key, score in ranked[:limit]
+        ]
+
+    def best(self, name, kind):
+        """
+        Return the ID of the best match for `name` when it is confident enough, else None.
+
+        Used by `Circle`, `Album` and `Songs` to resolve names without touching TouhouDB.
+        """
+        results = self.search(name, kind=kind, limit=1)
+        if results and results[0]['score'] >= self.config.MIN_CONFIDENT_SCORE:
+            return results[0]['id']
+        return None
@@ -0,0 +1,261 @@
+# server.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+from aiohttp import web
+from cache import ResponseCache
+from circle import Circle
+from album import Album
+from song import Songs, ALBUM_TRACK_FIELDS
+from client import TouhouClient
+from lyrics import LyricsParser
+from metrics import Metrics
+from store import CatalogueStore
+from util.general import CacheConfig, ServerConfig, StoreConfig
+from util.lru import AsyncLRU
+from util.logs import get_logger, setup_logging
+
+logger = get_logger('server')
+
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _error_status(message):
+    if message.startswith('No ') or 'Status code: 404' in message:
+        return 404
+    return 502
+
+
+def _int_param(request, name):
+    try:
+        return int(request.match_info[name])
+    except ValueError:
+        raise web.HTTPBadRequest(text=_dumps({"error": f"{name} must be an integer"}).decode(),
+                                 content_type='application/json')
+
+
+class TouhouService:
+    """
+    Read API over `Circle`, `Album` and `Songs` sharing one client and their caches.
+
+    Responses are coalesced by path and query: concurrent identical requests
+    share one in-flight computation, and successful results are kept for
+    `ServerConfig.RESPONSE_TTL` seconds. Object responses are cached encoded;
+    list responses are streamed as a JSON array. Bodies are compressed when the
+    client accepts gzip or deflate. With a store attached, circles and circle
+    album lists are answered from it first (see `Circle.get_circle` and
+    `Album.albums_by_circle`).
+
+    Attributes:
+        - `client`: The shared `TouhouClient`.
+        - `circle`, `album`, `songs`: The API objects serving every request.
+        - `config`: The `ServerConfig` holding response cache and streaming settings.
+    """
+    def __init__(self, client, store=None, index=None, lyrics_parser=None, config=None):
+        self.config = config or ServerConfig()
+        self.client = client
+        self.circle = Circle(client=client, store=store, index=index)
+        self.album = Album(self.circle)
+        self.songs = Songs(self.album, lyrics_parser=lyrics_parser)
+        self.lyrics_parser = lyrics_parser
+        self._responses = AsyncLRU(self.config.RESPONSE_CACHE_SIZE, self.config.RESPONSE_TTL)
+
+    def routes(self):
+        return [
+            web.get('/circles/{name_or_id}', self.circle_handler),
+            web.get(r'/circles/{artist_id}/albums', self.circle_albums_handler),
+            web.get(r'/albums/{album_id}/songs', self.album_songs_handler),
+            web.get(r'/songs/{song_id}/lyrics', self.song_lyrics_handler),
+            web.get('/metrics', self.metrics_handler),
+            web.get('/health', self.health_handler),
+        ]
+
+    async def _coalesced(self, request, loader):
+        """
+        Return `(status, payload)` for this request, sharing work with identical requests.
+
+        The shared load runs in its own task: when aiohttp cancels the handler
+        of a disconnected client, the other requests waiting on it still get
+        the result.
+        """
+        return await self._responses.get_or_load(request.path_qs, loader, lambda result: result[0] == 200)
+
+    def _compress(self, request, response, size=None):
+        if size is not None and size < self.config.COMPRESS_MIN_SIZE:
+            return
+        accept = request.headers.get('Accept-Encoding', '')
+        if 'gzip' in accept:
+            response.enable_compression(web.ContentCoding.gzip)
+        elif 'deflate' in accept:
+            response.enable_compression(web.ContentCoding.deflate)
+
+    def _json_response(self, request, status, body):
+        response = web.Response(status=status, body=body, content_type='application/json', charset='utf-8')
+        self._compress(request, response, len(body))
+        return response
+
+    async def _stream_list(self, request, items):
+        """
+        Write `items` as a JSON array in batches of `ServerConfig.STREAM_BATCH`.
+        """
+        response = web.StreamResponse(headers={'Content-Type': JSON_CONTENT_TYPE})
+        self._compress(request, response)
+        await response.prepare(request)
+        await response.write(b'[')
+        batch = self.config.STREAM_BATCH
+        for start in range(0, len(items), batch):
+            chunk = b','.join(_dumps(item) for item in items[start:start + batch])
+            await response.write(chunk if start == 0 else b',' + chunk)
+        await response.write(b']')
+        await response.write_eof()
+        return response
+
+    # ---- handlers ----
+
+    async def circle_handler(self, request):
+        identifier = request.match_info['name_or_id']
+        if identifier.isdigit():
+            identifier = int(identifier)
+
+        async def load():
+            details = await self.circle.get_circle(identifier)
+            if 'error' in details:
+                return _error_status(details['error']), _dumps(details)
+            return 200, _dumps(details)
+
+        status, body = await self._coalesced(request, load)
+        return self._json_response(request, status, body)
+
+    async def circle_albums_handler(self, request):
+        artist_id = _int_param(request, 'artist_id')
+
+        async def load():
+            if self.album.store is not None:
+                albums = await self.album.albums_by_circle(artist_id)
+                if isinstance(albums, dict):
+                    return _error_status(albums['error']), albums
+                return 200, albums
+            albums = []
+            async for album in self.album.iter_albums(artist_id):
+                if 'error' in album:
+                    return _error_status(album['error']), album
+                albums.append(album)
+            return 200, albums
+
+        status, payload = await self._coalesced(request, load)
+        if status != 200:
+            return self._json_response(request, status, _dumps(payload))
+        return await self._stream_list(request, payload)
+
+    async def album_songs_handler(self, request):
+        album_id = _int_param(request, 'album_id')
+        include_lyrics = request.query.get('lyrics', '').lower() in ('1', 'true', 'yes')
+
+        async def load():
+            album = await self.album._album_details(album_id, ALBUM_TRACK_FIELDS)
+            if 'error' in album:
+                return _error_status(album['error']), album
+            return 200, await self.songs.song_list_by_album(album_id, include_lyrics=include_lyrics)
+
+        status, payload = await self._coalesced(request, load)
+        if status != 200:
+            return self._json_response(request, status, _dumps(payload))
+        return await self._stream_list(request, payload)
+
+    async def song_lyrics_handler(self, request):
+        song_id = _int_param(request, 'song_id')
+
+        async def load():
+            details = await self.songs._fetch_song_details(song_id, ('song',))
+            if 'error' in details:
+                return _error_status(details['error']), _dumps(details)
+            song = details.get('song') or {}
+            lyrics = await self.songs.fetch_lyrics(song.get('defaultName') or song.get('name'))
+            if 'error' in lyrics:
+                return _error_status(lyrics['error']), _dumps(lyrics)
+            result = {'songId': song_id, **lyrics}
+            if self.lyrics_parser is not None:
+                parsed = await self.lyrics_parser.parse(lyrics['title'], lyrics['revid'], lyrics['wikitext'])
+                result['lines'] = parsed['lines']
+            return 200, _dumps(result)
+
+        status, body = await self._coalesced(request, load)
+        return self._json_response(request, status, body)
+
+    async def metrics_handler(self, request):
+        if self.client.metrics is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=self.client.metrics.render(), content_type='text/plain', charset='utf-8')
+
+    async def health_handler(self, request):
+        return self._json_response(request, 200, b'{"status":"ok"}')
+
+
+def create_app(client=None, store=None, index=None, lyrics_parser=None, config=None):
+    """
+    Build the aiohttp application serving the read API.
+
+    The client (and the store and lyrics parser, when given) are closed on shutdown.
+
+    Args:
+        - `client`: The shared `TouhouClient`; a new one is created when omitted.
+        - `store`: Optional `CatalogueStore` answering circle and circle-album lookups before TouhouDB.
+        - `index`: Optional offline `SearchIndex` for name resolution.
+        - `lyrics_parser`: Optional `LyricsParser`; adds parsed `lines` to lyrics responses.
+    """
+    client = client or TouhouClient()
+    service = TouhouService(client, store=store, index=index, lyrics_parser=lyrics_parser, config=config)
+    app = web.Application()
+    app['service'] = service
+    app.add_routes(service.routes())
+
+    async def close(app):
+        await client.close()
+        if store is not None:
+            store.close()
+        if lyrics_parser is not None:
+            lyrics_parser.close()
+
+    app.on_cleanup.append(close)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve circles, albums, songs and lyrics over HTTP.")
+    parser.add_argument('--host', help="Interface to bind.")
+    parser.add_argument('--port', type=int, help="Port to listen on.")
+    parser.add_argument('--cache', help="Path of the SQLite response cache shared across restarts.")
+    parser.add_argument('--store', help="Path of a SQLite catalogue store to answer from first.")
+    parser.add_argument('--parse-lyrics', action='store_true', help="Add parsed per-language lines to lyrics.")
+    parser.add_argument('--metrics', action='store_true', help="Collect request metrics and serve them at /metrics.")
+    parser.add_argument('--log-level', help="Logging level, e.g. INFO or DEBUG.")
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level)
+    ServerConfig.configure(host=args.host, port=args.port)
+
+    cache = None
+    if args.cache:
+        CacheConfig.configure(path=args.cache)
+        cache = ResponseCache()
+    store = None
+    if args.store:
+        StoreConfig.configure(path=args.store)
+        store = CatalogueStore()
+    client = TouhouClient(cache=cache, metrics=Metrics() if args.metrics else None)
+    lyrics_parser = LyricsParser() if args.parse_lyrics else None
+    app = create_app(client, store=store, lyrics_parser=lyrics_parser)
+    logger.info("serving", extra={'host': ServerConfig.HOST, 'port': ServerConfig.PORT})
+    web.run_app(app, host=ServerConfig.HOST, port=ServerConfig.PORT, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+# sharding.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import multiprocessing
+import shutil
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from client import TouhouClient
+from crawler import Crawler, iter_catalogue
+from export import JsonlSink
+from metrics import Metrics
+from store import CatalogueStore
+from util.general import ClientConfig, CrawlerConfig, LoggingConfig, StoreConfig
+from util.logs import get_logger, setup_logging
+from util.text import normalize_name
+
+logger = get_logger('sharding')
+
+
+def shard_of(identifier, shards):
+    """
+    Stable shard index of a circle ID or name, identical across runs and processes.
+    """
+    if isinstance(identifier, int):
+        return identifier % shards
+    return zlib.crc32(normalize_name(identifier).encode('utf-8')) % shards
+
+
+def partition(circles, shards):
+    """
+    Split circle IDs or names into `shards` lists with `shard_of`.
+    """
+    parts = [[] for _ in range(shards)]
+    for identifier in circles:
+        parts[shard_of(identifier, shards)].append(identifier)
+    return parts
+
+
+def split_rate_budget(shards):
+    """
+    Divide the per-host rate limits and burst of `ClientConfig` evenly between shards.
+
+    Returns:
+        Keyword arguments for `ClientConfig.configure` in each shard process.
+    """
+    return {
+        'rate_limits': {host: rate / shards for host, rate in ClientConfig.RATE_LIMITS.items()},
+        'default_rate_limit': ClientConfig.DEFAULT_RATE_LIMIT / shards,
+        'burst': ClientConfig.BURST / shards,
+    }
+
+
+@dataclass(slots=True)
+class ShardSpec:
+    """
+    Everything a shard process needs, picklable for the process pool.
+    """
+    index: int
+    shards: int
+    circles: list
+    checkpoint_path: str
+    output_path: str = None
+    compression: str = None
+    store_path: str = None
+    metrics_path: str = None
+    client_limits: dict = field(default_factory=dict)
+    workers: int = CrawlerConfig.WORKERS
+    lean: bool = False
+    include_lyrics: bool = True
+    log_level: object = LoggingConfig.LEVEL
+    log_json: bool = False
+
+
+def run_shard(spec):
+    """
+    Crawl one shard in the current process with its own event loop and pooled client.
+
+    Module-level so it can be submitted to a `ProcessPoolExecutor`.
+
+    Returns:
+        The shard's crawl `stats`.
+    """
+    setup_logging(spec.log_level, spec.log_json)
+    ClientConfig.configure(**spec.client_limits)
+    CrawlerConfig.configure(workers=spec.workers, checkpoint_path=spec.checkpoint_path,
+                            lean=spec.lean, include_lyrics=spec.include_lyrics)
+    if spec.store_path:
+        StoreConfig.configure(path=spec.store_path)
+    return asyncio.run(_crawl_shard(spec))
+
+
+async def _crawl_shard(spec):
+    metrics = Metrics() if spec.metrics_path else None
+    store = CatalogueStore() if spec.store_path else None
+    # A shard resuming from its checkpoint adds to its part of the interrupted run.
+    resume = os.path.exists(spec.checkpoint_path)
+    sink = JsonlSink(spec.output_path, spec.compression, append=resume) if spec.output_path else None
+    if sink is not None:
+        await sink.open()
+    try:
+        async with TouhouClient(metrics=metrics) as client:
+            stats = await Crawler(client, store=store, sink=sink).crawl(spec.circles)
+    finally:
+        if sink is not None:
+            await sink.close()
+        if store is not None:
+            store.close()
+        if metrics is not None:
+            metrics.write(spec.metrics_path)
+    logger.info("shard finished", extra={'shard': spec.index, **stats})
+    return stats
+
+
+class ShardedCrawler:
+    """
+    Crawl circles in parallel worker processes to use more than one core.
+
+    Circles are partitioned with `shard_of`; each shard runs a full `Crawler`
+    (its own event loop, `TouhouClient` and `Circle`/`Album`/`Songs`) in a
+    separate process, so JSON decoding and record normalization scale with
+    cores. The per-host rate limits are divided between shards so the crawl as
+    a whole stays within `ClientConfig.RATE_LIMITS`.
+
+    Every shard writes its own checkpoint, JSON Lines part and store part.
+    Parts are merged once all shards finish: JSON Lines parts are concatenated
+    (gzip and zstd streams stay valid when concatenated) and store parts are
+    upserted into the target store. Checkpoints are kept per shard, so a
+    resumed crawl must use the same shard count.
+
+    Attributes:
+        - `shards`: Number of worker processes.
+        - `config`: The `CrawlerConfig` providing workers, checkpoint path and lyrics settings.
+    """
+    def __init__(self, shards=None, config=None):
+        self.config = config or CrawlerConfig()
+        self.shards = shards or self.config.SHARDS
+
+    def _part(self, path, index):
+        return f"{path}.{index}-of-{self.shards}" if path else None
+
+    def specs(self, circles, output=None, compression=None, store_path=None, metrics_path=None):
+        """
+        Build one `ShardSpec` per shard for the given circles.
+        """
+        limits = split_rate_budget(self.shards)
+        return [
+            ShardSpec(
+                index=index,
+                shards=self.shards,
+                circles=part,
+                checkpoint_path=self._part(self.config.CHECKPOINT_PATH, index),
+                output_path=self._part(output, index),
+                compression=compression,
+                store_path=self._part(store_path, index),
+                metrics_path=self._part(metrics_path, index),
+                client_limits=limits,
+                workers=self.config.WORKERS,
+                lean=self.config.LEAN,
+                include_lyrics=self.config.INCLUDE_LYRICS,
+                log_level=LoggingConfig.LEVEL,
+                log_json=LoggingConfig.JSON,
+            )
+            for index, part in enumerate(partition(circles, self.shards))
+        ]
+
+    async def crawl(self, circles=None, output=None, compression=None, store_path=None, metrics_path=None):
+        """
+        Crawl the given circles, or the whole catalogue when `circles` is None.
+
+        Args:
+            - `circles`: Circle names or IDs.
+            - `output`: Path of the merged JSON Lines export, or None.
+            - `compression`: Compression of the export (`gzip`, `zstd` or None).
+            - `store_path`: Path of the SQLite catalogue store to merge into, or None.
+            - `metrics_path`: Base path of per-shard metrics files, or None.
+
+        Returns:
+            The summed `stats` of every shard.
+        """
+        if circles is None:
+            async with TouhouClient() as client:
+                circles = [circle_id async for circle_id in iter_catalogue(client)]
+        specs = self.specs(circles, output, compression, store_path, metrics_path)
+        resume = any(os.path.exists(spec.checkpoint_path) for spec in specs)
+
+        loop = asyncio.get_running_loop()
+        # Spawned rather than forked so no event loop or socket is inherited from this process.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.shards, mp_context=context) as pool:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, run_shard, spec) for spec in specs),
+                return_exceptions=True,
+            )
+
+        stats = {'circles': 0, 'albums': 0, 'songs': 0, 'errors': 0}
+        for spec, result in zip(specs, results):
+            if isinstance(result, Exception):
+                logger.error("shard %d failed: %s: %s", spec.index, type(result).__name__, result)
+                stats['errors'] += 1
+                continue
+            for key, value in result.items():
+                stats[key] = stats.get(key, 0) + value
+
+        if output:
+            merge_outputs([spec.output_path for spec in specs], output, append=resume)
+        if store_path:
+            merge_stores([spec.store_path for spec in specs], store_path)
+        return stats
+
+
+def merge_outputs(parts, path, append=False):
+    """
+    Concatenate JSON Lines parts into `path` and delete the parts.
+
+    With `append`, the parts are added to an existing `path`, e.g. the export
+    of an interrupted crawl being resumed.
+    """
+    with open(path, 'ab' if append else 'wb') as out:
+        for part in parts:
+            if part and os.path.exists(part):
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                os.remove(part)
+
+
+def merge_stores(parts, path):
+    """
+    Upsert every store part into the catalogue at `path` and delete the parts.
+    """
+    StoreConfig.configure(path=path)
+    store = CatalogueStore()
+    try:
+        for part in parts:
+            if part and os.path.exists(part):
+                store.merge(part)
+                os.remove(part)
+    finally:
+        store.close()
@@ -0,0 +1,419 @@
+# snapshot.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import mmap
+import struct
+import time
+from array import array
+from models import Album, Artist, Lyrics, Song, Track
+from search_index import name_keys
+from store import CatalogueStore
+from util.general import SnapshotConfig, StoreConfig
+
+MAGIC = b'THSNAP02'
+# Stand-in for None in integer columns.
+NULL = -(1 << 63)
+KINDS = ('artist', 'album', 'song')
+
+_HEADER = struct.Struct('<8sBxxxI')
+_SECTION = struct.Struct('<32sQQ')
+_NATIVE_ORDER = 0 if sys.byteorder == 'little' else 1
+
+
+def _int(value):
+    return NULL if value is None else value
+
+
+def _nullable(value):
+    return None if value == NULL else value
+
+
+class _Writer:
+    """
+    Collects integer columns and an interned string table, then lays them out on disk.
+    """
+    def __init__(self):
+        self.columns = {}
+        self._strings = {}
+        self._string_list = []
+
+    def intern(self, value):
+        if value is None:
+            return -1
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._string_list)
+            self._string_list.append(value)
+        return index
+
+    def column(self, name):
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = array('q')
+        return column
+
+    def write(self, path):
+        encoded = [value.encode('utf-8') for value in self._string_list]
+        offsets = array('q', [0])
+        total = 0
+        for data in encoded:
+            total += len(data)
+            offsets.append(total)
+        sections = [('strings.offsets', offsets.tobytes()), ('strings.data', b''.join(encoded))]
+        sections += [(name, column.tobytes()) for name, column in self.columns.items()]
+
+        position = _HEADER.size + _SECTION.size * len(sections)
+        table = []
+        for name, data in sections:
+            position += -position % 8
+            table.append((name, position, len(data)))
+            position += len(data)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, _NATIVE_ORDER, len(sections)))
+            for name, offset, length in table:
+                f.write(_SECTION.pack(name.encode('ascii'), offset, length))
+            for (name, offset, length), (_, data) in zip(table, sections):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(data)
+        os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """
+    Memory-mapped, read-only binary snapshot of the catalogue.
+
+    Artists, albums, songs, lyrics and a whole-name index are stored as
+    fixed-width integer columns (sorted by ID) plus one interned UTF-8 string
+    table. Loading maps the file and wraps each column in a `memoryview`, so
+    cold start costs no parsing; rows are decoded into models on access.
+
+    A snapshot offers `best(name, kind)`, so it can be passed as the `index`
+    of `Circle`, `Album` and `Songs` to resolve names without TouhouDB.
+
+    Attributes:
+        - `path`: The snapshot file.
+        - `counts`: Number of rows per entity kind and of lyrics.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._columns = {}
+        try:
+            magic, order, count = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a catalogue snapshot")
+            if order != _NATIVE_ORDER:
+                raise ValueError(f"{path} was written on a machine with a different byte order")
+            for i in range(count):
+                name, offset, length = _SECTION.unpack_from(self._map, _HEADER.size + i * _SECTION.size)
+                section = self._view[offset:offset + length]
+                name = name.rstrip(b'\0').decode('ascii')
+                self._columns[name] = section if name == 'strings.data' else section.cast('q')
+        except Exception:
+            self.close()
+            raise
+        self._string_offsets = self._columns['strings.offsets']
+        self._string_data = self._columns['strings.data']
+        self.counts = {
+            'artist': len(self._columns['artists.id']),
+            'album': len(self._columns['albums.id']),
+            'song': len(self._columns['songs.id']),
+            'lyrics': len(self._columns['lyrics.song_id']),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    # ---- building ----
+
+    @classmethod
+    def build(cls, store, path=None):
+        """
+        Write a snapshot of every row of a `CatalogueStore` and open it.
+
+        Args:
+            - `store`: The `CatalogueStore` to snapshot.
+            - `path`: Target file; defaults to `SnapshotConfig.PATH`.
+        """
+        path = path or SnapshotConfig.PATH
+        db = store._db
+        writer = _Writer()
+        names = []
+
+        def add_names(kind, entity_id, name, additional_names):
+            for primary, value in ((1, name), (0, additional_names)):
+                parts = [value] if primary else [p.strip() for p in (value or '').split(',')]
+                for part in filter(None, parts):
+                    for key in name_keys(part):
+                        names.append((key, -primary, KINDS.index(kind), entity_id))
+
+        for row in db.execute('SELECT * FROM artists ORDER BY id'):
+            writer.column('artists.id').append(row['id'])
+            for column in ('name', 'additional_names', 'artist_type', 'picture'):
+                writer.column(f'artists.{column}').append(writer.intern(row[column]))
+            add_names('artist', row['id'], row['name'], row['additional_names'])
+
+        album_artists = _grouped(db, 'SELECT album_id, artist_id FROM album_artists ORDER BY album_id, artist_id')
+        tracks = _grouped(db, 'SELECT album_id, song_id, name, disc_number, track_number FROM tracks'
+                              ' ORDER BY album_id, disc_number, track_number')
+        writer.column('albums.track_start').append(0)
+        writer.column('albums.artist_start').append(0)
+        for row in db.execute('SELECT albums.*, release_events.name AS release_event FROM albums'
+                              ' LEFT JOIN release_events ON release_events.id = albums.release_event_id ORDER BY albums.id'):
+            album_id = row['id']
+            writer.column('albums.id').append(album_id)
+            for column in ('name', 'additional_names', 'artist_string', 'release_date', 'release_event', 'picture'):
+                writer.column(f'albums.{column}').append(writer.intern(row[column]))
+            writer.column('albums.release_event_id').append(_int(row['release_event_id']))
+            writer.column('albums.version').append(_int(row['version']))
+            for track in tracks.get(album_id, ()):
+                writer.column('tracks.song_id').append(_int(track[1]))
+                writer.column('tracks.name').append(writer.intern(track[2]))
+                writer.column('tracks.disc_number').append(_int(track[3]))
+                writer.column('tracks.track_number').append(_int(track[4]))
+            for artist in album_artists.get(album_id, ()):
+                writer.column('album_artists.artist_id').append(artist[1])
+            writer.column('albums.track_start').append(len(writer.column('tracks.song_id')))
+            writer.column('albums.artist_start').append(len(writer.column('album_artists.artist_id')))
+            add_names('album', album_id, row['name'], row['additional_names'])
+
+        song_artists = _grouped(db, 'SELECT song_id, artist_id FROM song_artists ORDER BY song_id, artist_id')
+        song_albums = _grouped(db, 'SELECT DISTINCT song_id, album_id FROM tracks WHERE song_id IS NOT NULL'
+                                   ' ORDER BY song_id, album_id')
+        writer.column('songs.artist_start').append(0)
+        writer.column('songs.album_start').append(0)
+        for row in db.execute('SELECT * FROM songs ORDER BY id'):
+            song_id = row['id']
+            writer.column('songs.id').append(song_id)
+            for column in ('name', 'additional_names', 'song_type', 'artist_string'):
+                writer.column(f'songs.{column}').append(writer.intern(row[column]))
+            writer.column('songs.original_version_id').append(_int(row['original_version_id']))
+            writer.column('songs.version').append(_int(row['version']))
+            for artist in song_artists.get(song_id, ()):
+                writer.column('song_artists.artist_id').append(artist[1])
+            for album in song_albums.get(song_id, ()):
+                writer.column('song_albums.album_id').append(album[1])
+            writer.column('songs.artist_start').append(len(writer.column('song_artists.artist_id')))
+            writer.column('songs.album_start').append(len(writer.column('song_albums.album_id')))
+            add_names('song', song_id, row['name'], row['additional_names'])
+
+        for row in db.execute('SELECT * FROM lyrics ORDER BY song_id'):
+            writer.column('lyrics.song_id').append(row['song_id'])
+            writer.column('lyrics.title').append(writer.intern(row['title']))
+            writer.column('lyrics.wikitext').append(writer.intern(row['wikitext']))
+
+        # Empty tables still get their columns so every snapshot has the same layout.
+        for name in SECTIONS:
+            writer.column(name)
+
+        for key, primary, kind, entity_id in sorted(set(names)):
+            writer.column('names.key').append(writer.intern(key))
+            writer.column('names.kind').append(kind)
+            writer.column('names.id').append(entity_id)
+
+        writer.write(path)
+        return cls(path)
+
+    # ---- access ----
+
+    def _str(self, index):
+        if index < 0:
+            return None
+        start, end = self._string_offsets[index], self._string_offsets[index + 1]
+        return str(self._string_data[start:end], 'utf-8')
+
+    def _position(self, table, entity_id):
+        ids = self._columns[f'{table}.id' if table != 'lyrics' else 'lyrics.song_id']
+        lo, hi = 0, len(ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ids[mid] < entity_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(ids) and ids[lo] == entity_id else None
+
+    def _strings_at(self, table, columns, i):
+        return {column: self._str(self._columns[f'{table}.{column}'][i]) for column in columns}
+
+    def artist(self, artist_id):
+        """
+        Return the `Artist` with this ID, or None.
+        """
+        i = self._position('artists', artist_id)
+        if i is None:
+            return None
+        return Artist(id=artist_id, **self._strings_at('artists', ('name', 'additional_names', 'artist_type', 'picture'), i))
+
+    def album(self, album_id):
+        """
+        Return the `Album` with this ID, including tracks and credited artist IDs, or None.
+        """
+        i = self._position('albums', album_id)
+        if i is None:
+            return None
+        c = self._columns
+        start, end = c['albums.track_start'][i], c['albums.track_start'][i + 1]
+        tracks = tuple(
+            Track(
+                song_id=_nullable(c['tracks.song_id'][t]),
+                name=self._str(c['tracks.name'][t]),
+                disc_number=_nullable(c['tracks.disc_number'][t]),
+                track_number=_nullable(c['tracks.track_number'][t]),
+            )
+            for t in range(start, end)
+        )
+        artists = c['album_artists.artist_id'][c['albums.artist_start'][i]:c['albums.artist_start'][i + 1]]
+        return Album(
+            id=album_id,
+            release_event_id=_nullable(c['albums.release_event_id'][i]),
+            version=_nullable(c['albums.version'][i]),
+            tracks=tracks,
+            artist_ids=tuple(artists),
+            **self._strings_at('albums', ('name', 'additional_names', 'artist_string', 'release_date',
+                                          'release_event', 'picture'), i),
+        )
+
+    def song(self, song_id):
+        """
+        Return the `Song` with this ID, including album and artist IDs, or None.
+        """
+        i = self._position('songs', song_id)
+        if i is None:
+            return None
+        c = self._columns
+        return Song(
+            id=song_id,
+            original_version_id=_nullable(c['songs.original_version_id'][i]),
+            version=_nullable(c['songs.version'][i]),
+            album_ids=tuple(c['song_albums.album_id'][c['songs.album_start'][i]:c['songs.album_start'][i + 1]]),
+            artist_ids=tuple(c['song_artists.artist_id'][c['songs.artist_start'][i]:c['songs.artist_start'][i + 1]]),
+            **self._strings_at('songs', ('name', 'additional_names', 'song_type', 'artist_string'), i),
+        )
+
+    def lyrics(self, song_id):
+        """
+        Return the `Lyrics` of this song, or None.
+        """
+        i = self._position('lyrics', song_id)
+        if i is None:
+            return None
+        return Lyrics(song_id=song_id, **self._strings_at('lyrics', ('title', 'wikitext'), i))
+
+    def iter_models(self, kind):
+        """
+        Yield every `artist`, `album`, `song` or `lyrics` model in ID order.
+        """
+        table = {'artist': 'artists', 'album': 'albums', 'song': 'songs', 'lyrics': 'lyrics'}[kind]
+        getter = getattr(self, 'lyrics' if kind == 'lyrics' else kind)
+        for entity_id in self._columns[f'{table}.id' if kind != 'lyrics' else 'lyrics.song_id']:
+            yield getter(entity_id)
+
+    def ids(self, name, kind):
+        """
+        Return the IDs of `kind` entities whose name or additional name matches `name` exactly.
+
+        Matching uses the same normalized, kana-folded keys as `SearchIndex`;
+        entities matched by their primary name come first.
+        """
+        keys = self._columns['names.key']
+        kinds = self._columns['names.kind']
+        entity_ids = self._columns['names.id']
+        wanted = KINDS.index(kind)
+        found = []
+        for key in sorted(name_keys(name)):
+            lo, hi = 0, len(keys)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._str(keys[mid]) < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            while lo < len(keys) and self._str(keys[lo]) == key:
+                if kinds[lo] == wanted and entity_ids[lo] not in found:
+                    found.append(entity_ids[lo])
+                lo += 1
+        return found
+
+    def best(self, name, kind):
+        """
+        Return the ID of the entity named `name`, or None; same contract as `SearchIndex.best`.
+        """
+        found = self.ids(name, kind)
+        return found[0] if found else None
+
+
+# Columns every snapshot carries.
+SECTIONS = (
+    'artists.id', 'artists.name', 'artists.additional_names', 'artists.artist_type', 'artists.picture',
+    'albums.id', 'albums.name', 'albums.additional_names', 'albums.artist_string', 'albums.release_date',
+    'albums.release_event_id', 'albums.release_event', 'albums.picture', 'albums.version',
+    'albums.track_start', 'albums.artist_start',
+    'tracks.song_id', 'tracks.name', 'tracks.disc_number', 'tracks.track_number', 'album_artists.artist_id',
+    'songs.id', 'songs.name', 'songs.additional_names', 'songs.song_type', 'songs.artist_string', 'songs.original_version_id',
+    'songs.version', 'songs.artist_start', 'songs.album_start', 'song_artists.artist_id', 'song_albums.album_id',
+    'lyrics.song_id', 'lyrics.title', 'lyrics.wikitext',
+    'names.key', 'names.kind', 'names.id',
+)
+
+
+def _grouped(db, query):
+    groups = {}
+    for row in db.execute(query):
+        groups.setdefault(row[0], []).append(tuple(row))
+    return groups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a binary catalogue snapshot.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Snapshot a SQLite catalogue store.")
+    build.add_argument('--store', help="Path of the catalogue store.")
+    build.add_argument('--output', help="Path of the snapshot file.")
+    info = commands.add_parser('info', help="Show row counts and load time of a snapshot.")
+    info.add_argument('path', nargs='?')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        if args.store:
+            StoreConfig.configure(path=args.store)
+        store = CatalogueStore()
+        try:
+            start = time.perf_counter()
+            with Snapshot.build(store, args.output) as snapshot:
+                print(f"Wrote {snapshot.path} ({os.path.getsize(snapshot.path)} bytes) in "
+                      f"{time.perf_counter() - start:.2f}s:", snapshot.counts)
+        finally:
+            store.close()
+    else:
+        start = time.perf_counter()
+        with Snapshot(args.path or SnapshotConfig.PATH) as snapshot:
+            print(f"Loaded {snapshot.path} in {(time.perf_counter() - start) * 1000:.2f}ms:", snapshot.counts)
+
+
+if __name__ == '__main__':
+    main()
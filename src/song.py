@@ -1,112 +1,344 @@
 # song.py
 
-import urllib.parse
-import re
 import asyncio
-import aiohttp
-import json
+from dataclasses import dataclass, field
 from urls import TDB_USAGE_URL, THWIKI
-from circle import Circle, CircleIdentifier
-from album import Album, AlbumIdentifier
+from projection import MODEL_FIELDS, plan, load_projected, invalidate
+from circle import Circle
+from album import Album
+from client import TouhouClient
+from util.general import SongsConfig
+from util.lru import AsyncLRU, not_error
+from util.concurrency import bounded_gather, resolve_many
+from util.text import normalize_name
+from util.logs import get_logger
 
+logger = get_logger('song')
+
+# The only album fields `song_list_by_album` reads.
+ALBUM_TRACK_FIELDS = ('id', 'name', 'songs')
+
+@dataclass(slots=True)
 class SongIdentifier:
-    
-    CIRCLE_NAME = CircleIdentifier.ARTIST_NAME
-    ALBUM_NAME = AlbumIdentifier.ALBUM_NAME
-    ALBUM_ID = None
-    SONG_NAME = None
-    SONG_ID = None
-    SONG_LIST = {
-        'Song Title': SONG_NAME,
-        'Song ID': SONG_ID
-    }
-    ALBUM_LIST_WITH_SONGS = {**AlbumIdentifier.ALBUM_LIST, **SONG_LIST}
+    """
+    Per-instance record of the song most recently resolved by a `Songs`.
+    """
+    CIRCLE_NAME: str = None
+    ALBUM_NAME: str = None
+    ALBUM_ID: int = None
+    SONG_NAME: str = None
+    SONG_ID: int = None
+    SONG_LIST: dict = field(default_factory=dict)
 
 class Songs:
-    def __init__(self):
+    def __init__(self, album_instance=None, config=None, client=None, store=None, index=None, lyrics_parser=None,
+                 graph=None):
         self.song_identifier = SongIdentifier()
-        self.album_instance = Album(Circle())  # Pass a Circle instance directly here
+        self.config = config or SongsConfig()
+        self.client = client or (album_instance.client if album_instance else TouhouClient())
+        self.album_instance = album_instance or Album(Circle(client=self.client, store=store, index=index))
+        self.store = store if store is not None else self.album_instance.store
+        self.index = index if index is not None else self.album_instance.index
+        self.lyrics_parser = lyrics_parser
+        self.graph = graph
         self.song_list = {}
+        self._details_cache = AsyncLRU(self.config.CACHE_SIZE, self.config.CACHE_TTL)
+        self._id_cache = AsyncLRU(self.config.CACHE_SIZE, self.config.CACHE_TTL)
+        self._lyrics_cache = AsyncLRU(self.config.CACHE_SIZE, self.config.CACHE_TTL)
 
     async def _songs_by_id(self,  songs_id, **kwargs):
-        return await self._songs_details(songs_id **kwargs)
+        return await self._song_details(songs_id, **kwargs)
     
     async def search_song_name(self, song_name, **kwargs):
+        songs_id = await self._id_cache.get_or_load(
+            normalize_name(song_name), lambda: self._resolve_song_id(song_name), not_error
+        )
+        if isinstance(songs_id, dict):
+            return songs_id
+        self.song_identifier.SONG_NAME = song_name
+        self.song_identifier.SONG_ID = songs_id
+        return await self._song_details(songs_id, **kwargs)
+
+    async def resolve_many(self, names, include_lyrics=False):
+        """
+        Resolve many song names to their song details in one batch.
+
+        Names are normalized and deduplicated so each distinct song costs one
+        search and one details call, with at most `SongsConfig.RESOLVE_CONCURRENCY`
+        lookups in flight.
+
+        Returns:
+            A dictionary mapping every input name to its song details or an error dictionary.
+        """
+        async def resolve(name):
+            songs_id = await self._id_cache.get_or_load(
+                normalize_name(name), lambda: self._resolve_song_id(name), not_error
+            )
+            if isinstance(songs_id, dict):
+                return songs_id
+            details = await self._fetch_song_details(songs_id)
+            if include_lyrics and 'error' not in details:
+                song_data = details.get('song') or {}
+                details = {**details, 'thwiki_lyrics': await self.fetch_lyrics(song_data.get('defaultName') or name)}
+            return details
+
+        return await resolve_many(names, resolve, self.config.RESOLVE_CONCURRENCY, normalize_name)
+
+    async def _resolve_song_id(self, song_name):
+        if self.index is not None:
+            songs_id = self.index.best(song_name, 'song')
+            if songs_id is not None:
+                return songs_id
         song_search_url = TDB_USAGE_URL.search_song_id_by_name(song_name)
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(song_search_url, headers=TDB_USAGE_URL.HEADERS)
-            data = await response.json()
-            if response.status == 200:
-                data = await response.json()
-                songs = data.get('items', [])
-                if songs:
-                    songs_id = songs[0]['id']
-                    return await self._song_details(songs_id)
-                else:
-                    return {"error": f"No album found for {song_name}"}
+        status, data = await self.client.get_json(song_search_url, headers=TDB_USAGE_URL.HEADERS)
+        if data is None:
+            return {"error": f"Failed to fetch song details. Status code: {status}"}
+        songs = data.get('items', [])
+        if songs:
+            return songs[0]['id']
+        else:
+            return {"error": f"No song found for {song_name}"}
+
+    async def _song_details(self, song_id, include_lyrics=True, fields=None):
+        data = await self._fetch_song_details(song_id, fields)
+        if 'error' in data:
+            return data
+
+        if include_lyrics and 'song' in data:
+            song_data = data['song']
+
+            if isinstance(song_data, dict):
+                # Extracting the song name
+                song_name = song_data.get('defaultName') or song_data.get('name')
+                data = {**data, 'thwiki_lyrics': await self.fetch_lyrics(song_name)}
             else:
-                return {"error": f"Failed to fetch album details. Status code: {response.status}"}
+                logger.warning("unexpected format for 'song' field: expected a dictionary, got %s", type(song_data).__name__,
+                               extra={'song_id': song_id})
+        return data
+
+    async def _fetch_song_details(self, song_id, fields=None, revalidate=False):
+        """
+        Fetch a song's TouhouDB details, memoized per song and field selection.
+
+        Args:
+            - `song_id`: The ID of the song.
+            - `fields`: Optional `/details` keys to fetch (e.g. `("song", "albums")`);
+              the lighter `api/songs/{id}` endpoint is used when it covers them.
+            - `revalidate`: Drop the memoized details and revalidate any cached
+              response with TouhouDB, e.g. when the song is known to have changed.
+        """
+        if revalidate:
+            invalidate(self._details_cache, song_id)
+        return await load_projected(
+            self._details_cache, song_id, fields,
+            lambda fields: self._request_song_details(song_id, fields, revalidate),
+        )
+
+    async def _request_song_details(self, song_id, fields=None, revalidate=False):
+        url, params, normalize = plan('song', song_id, fields)
+        status, data = await self.client.get_json(url, params=params, headers=TDB_USAGE_URL.HEADERS,
+                                                  revalidate=revalidate)
+        if data is None:
+            return {"error": f"Failed to fetch song details. Status code: {status}"}
+        data = normalize(data)
+        if self.graph is not None:
+            self.graph.add_record('song', data)
+        return data
 
-    async def _song_details(self, song_id, include_lyrics=True):
-        song_details_url=TDB_USAGE_URL.get_song_details(song_id)
-        async with aiohttp.ClientSession()as session:
-            response=await session.get(song_details_url,headers=TDB_USAGE_URL.HEADERS)
-            data=await response.json()
-            print(json.dumps(data, ensure_ascii=False, indent=4))
-            
+    async def fetch_lyrics(self, song_name):
+        return await self._lyrics_cache.get_or_load(
+            song_name, lambda: self._request_lyrics(song_name), not_error
+        )
 
-            if include_lyrics and 'song' in data:
-                song_data = data['song']
+    async def _request_lyrics(self, song_name):
+        th_params = THWIKI.lyrics_search_by_song_title(song_name)
+        status, data = await self.client.get_json(THWIKI.API_URL, params=th_params, headers=THWIKI.TH_HEADERS)
+        if data is None or 'parse' not in data:
+            return {"error": f"Failed to fetch lyrics for {song_name}. Status code: {status}"}
+        return {"title": song_name, "revid": data['parse'].get('revid'), "wikitext": data['parse'].get('wikitext', '')}
 
-                if isinstance(song_data, dict):
-                    # Extracting the song name
-                    song_name = song_data.get('defaultName') or song_data.get('name')
 
-                    # Fetching lyrics based on song name
-                    th_api = THWIKI.API_URL
-                    th_headers = THWIKI.TH_HEADERS
-                    th_params = THWIKI.lyrics_search_by_song_title(song_name)
+    async def fetch_lyrics_batch(self, song_names):
+        """
+        Fetch TouhouWiki lyrics for many songs with multi-title `action=query` requests.
 
-                    async with aiohttp.ClientSession() as th_session:
-                        th_response = await th_session.get(th_api, params=th_params, headers=th_headers)
+        Titles are sent `THWIKI.MAX_TITLES` at a time; normalizations and
+        redirects reported by MediaWiki are followed back to the requested
+        song, and missing pages come back as error dictionaries. Found pages
+        are also stored in the per-title lyrics cache used by `fetch_lyrics`.
 
-                        if th_response.status == 200:
-                            th_lyrics_data = await th_response.json()
-                            th_lyrics_wikitext = th_lyrics_data.get('parse', {}).get('wikitext', '')
-                            print(f"Lyrics for {song_name}:\n{th_lyrics_wikitext}")
-                        else:
-                            print(f"Failed to fetch lyrics for {song_name}. Status code: {th_response.status}")
-                else:
-                    print(f"Unexpected format for 'song' field. Expected a dictionary, got {type(song_data)}.")
+        Returns:
+            A dictionary mapping every song name to its lyrics or an error dictionary.
+        """
+        names = list(dict.fromkeys(name for name in song_names if name))
+        chunks = [names[i:i + THWIKI.MAX_TITLES] for i in range(0, len(names), THWIKI.MAX_TITLES)]
+        results = await bounded_gather((self._query_lyrics(chunk) for chunk in chunks), self.config.LYRICS_CONCURRENCY)
+        lyrics = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                result = {name: {"error": f"Failed to fetch lyrics for {name}: {type(result).__name__}: {result}"} for name in chunk}
+            lyrics.update(result)
+        for name, entry in lyrics.items():
+            if 'error' not in entry:
+                self._lyrics_cache.set(name, entry)
+        return lyrics
+
+    async def _query_lyrics(self, song_names):
+        th_params = THWIKI.lyrics_query_by_titles(song_names)
+        status, data = await self.client.get_json(THWIKI.API_URL, params=th_params, headers=THWIKI.TH_HEADERS)
+        if data is None or 'query' not in data:
+            return {name: {"error": f"Failed to fetch lyrics for {name}. Status code: {status}"} for name in song_names}
+
+        query = data['query']
+        renames = {entry['from']: entry['to'] for entry in query.get('normalized', [])}
+        redirects = {entry['from']: entry['to'] for entry in query.get('redirects', [])}
+        pages = {page['title']: page for page in query.get('pages', [])}
+
+        lyrics = {}
+        for name in song_names:
+            title = f"Lyrics: {name}"
+            title = renames.get(title, title)
+            title = redirects.get(title, title)
+            page = pages.get(title)
+            revisions = (page or {}).get('revisions')
+            if not revisions:
+                lyrics[name] = {"error": f"No lyrics page found for {name}"}
+                continue
+            revision = revisions[0]
+            content = revision.get('slots', {}).get('main', {}).get('content', '')
+            lyrics[name] = {"title": name, "revid": revision.get('revid'), "wikitext": content}
+        return lyrics
 
 
 #///////////////////////search via album//////////////////////////////////////////////////////////////
-    async def song_list_by_album(self, identifier, **kwargs):
-        # Corrected the method call by passing the identifier
-        album_details = await self.album_instance._album_details_by_name_or_id(identifier, **kwargs)
-        song_list = []
-        if "songs" in album_details:
-            for song_info in album_details['songs']:
-                song_data = song_info.get('song', {})
-                song_id = song_data.get('id')
-                song_name = song_info.get('name')
-                if song_id and song_name:
-                    song_list.append({"id": song_id, "name": song_name})
-                    print(f"Processing : {song_name}")
-                    await self._song_details(song_id)
-        return song_list
+    async def song_list_by_album(self, identifier, include_lyrics=True, song_fields=None, **kwargs):
+        """
+        Fetch every track of an album with its details and TouhouWiki lyrics.
+
+        Track details (TouhouDB) and lyrics (TouhouWiki) run as two bounded stages
+        that overlap: a track moves on to its lyrics lookup as soon as its details
+        arrive, while other tracks are still waiting on TouhouDB. Only the album's
+        track list is requested; `song_fields` optionally narrows each song's
+        details the same way (see `projection.plan`).
+
+        Returns:
+            A list with one dictionary per track, in album order, holding `id`,
+            `name`, `details`, `lyrics` and `error`. With a `lyrics_parser`
+            attached, `lyrics` also carries the parsed per-language `lines`.
+        """
+        album_details = await self.album_instance._album_details_by_name_or_id(identifier, fields=ALBUM_TRACK_FIELDS, **kwargs)
+        tracks = []
+        for song_info in album_details.get('songs', []):
+            song_data = song_info.get('song') or {}
+            song_id = song_data.get('id')
+            song_name = song_info.get('name')
+            if song_id and song_name:
+                tracks.append({"id": song_id, "name": song_name})
+
+        details_semaphore = asyncio.Semaphore(self.config.MAX_CONCURRENCY)
+        lyrics_semaphore = asyncio.Semaphore(self.config.LYRICS_CONCURRENCY)
+
+        # Fetch the whole album's lyrics in one multi-title query while the
+        # details stage runs; tracks whose title differs fall back to a single lookup.
+        prefetch = None
+        if include_lyrics and len(tracks) > 1:
+            titles = [
+                (song_info.get('song') or {}).get('defaultName') or (song_info.get('song') or {}).get('name')
+                for song_info in album_details.get('songs', [])
+            ]
+            prefetch = asyncio.ensure_future(self.fetch_lyrics_batch(titles))
 
+        async def process(track):
+            result = {**track, "details": None, "lyrics": None, "error": None}
+            try:
+                async with details_semaphore:
+                    details = await self._fetch_song_details(track['id'], song_fields)
+                if 'error' in details:
+                    result['error'] = details['error']
+                    return result
+                result['details'] = details
+                if include_lyrics:
+                    song_data = details.get('song') or {}
+                    title = song_data.get('defaultName') or song_data.get('name') or track['name']
+                    batch = await prefetch if prefetch is not None else {}
+                    lyrics = batch.get(title)
+                    if lyrics is None:
+                        async with lyrics_semaphore:
+                            lyrics = await self.fetch_lyrics(title)
+                    if 'error' in lyrics:
+                        result['error'] = lyrics['error']
+                    elif self.lyrics_parser is not None:
+                        parsed = await self.lyrics_parser.parse(lyrics['title'], lyrics['revid'], lyrics['wikitext'])
+                        result['lyrics'] = {**lyrics, 'lines': parsed['lines']}
+                    else:
+                        result['lyrics'] = lyrics
+            except Exception as exc:
+                # One failing track must not discard the others; report it like an API error.
+                result['error'] = f"{type(exc).__name__}: {exc}"
+            return result
 
+        try:
+            return await asyncio.gather(*(process(track) for track in tracks))
+        finally:
+            if prefetch is not None and not prefetch.done():
+                prefetch.cancel()
 
 
 
+
+
+#///////////////////////local store//////////////////////////////////////////////////////////////
+    def songs_by_circle(self, artist_id):
+        """
+        List every stored song credited to a circle or appearing on its albums.
+        """
+        if self.store is None:
+            return {"error": "No catalogue store attached"}
+        return self.store.songs_by_artist(artist_id)
+
+    async def get_song(self, song_id):
+        """
+        Look up a song in the local store first, falling back to TouhouDB.
+        """
+        if self.store is not None:
+            row = self.store.song_by_id(song_id)
+            if row is not None:
+                return row
+        details = await self._fetch_song_details(song_id, MODEL_FIELDS['song'] if self.store is not None else None)
+        if 'error' in details or self.store is None:
+            return details
+        self.store.add_sync('song', details)
+        self.store.flush()
+        return self.store.song_by_id(song_id)
+
+    async def get_lyrics(self, song_id):
+        """
+        Return a song's TouhouWiki lyrics from the local store, fetching them on a miss.
+        """
+        if self.store is not None:
+            row = self.store.lyrics_for_song(song_id)
+            if row is not None:
+                return row
+        details = await self._fetch_song_details(song_id, MODEL_FIELDS['song'])
+        if 'error' in details:
+            return details
+        song_data = details.get('song') or {}
+        lyrics = await self.fetch_lyrics(song_data.get('defaultName') or song_data.get('name'))
+        if 'error' in lyrics or self.store is None:
+            return lyrics
+        self.store.add_sync('song', details)
+        self.store.add_sync('lyrics', {**lyrics, 'songId': song_id})
+        self.store.flush()
+        return self.store.lyrics_for_song(song_id)
+
+
 async def test_song_details():
-    songs_instance = Songs()
     song_name = "Feel The Flow"  # Replace with the song name you want to test
     album_name= 'Foreground Eclipse Demo CD Vol.01'
     
-    
-    await songs_instance.song_list_by_album(album_name)
+    async with TouhouClient() as client:
+        songs_instance = Songs(client=client)
+        await songs_instance.song_list_by_album(album_name)
     #await songs_instance.search_song_name(song_name)
     #await songs_instance.fetch_lyrics("White Wind")
 
@@ -0,0 +1,314 @@
+# store.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+from models import to_model
+from util.general import StoreConfig
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artists (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    additional_names TEXT,
+    artist_type TEXT,
+    picture TEXT
+);
+CREATE TABLE IF NOT EXISTS release_events (
+    id INTEGER PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS albums (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    additional_names TEXT,
+    artist_string TEXT,
+    release_date TEXT,
+    release_event_id INTEGER REFERENCES release_events(id),
+    picture TEXT,
+    version INTEGER
+);
+CREATE TABLE IF NOT EXISTS album_artists (
+    album_id INTEGER NOT NULL REFERENCES albums(id) ON DELETE CASCADE,
+    artist_id INTEGER NOT NULL REFERENCES artists(id),
+    PRIMARY KEY (album_id, artist_id)
+);
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    song_type TEXT,
+    artist_string TEXT,
+    original_version_id INTEGER,
+    version INTEGER,
+    additional_names TEXT
+);
+CREATE TABLE IF NOT EXISTS song_artists (
+    song_id INTEGER NOT NULL REFERENCES songs(id) ON DELETE CASCADE,
+    artist_id INTEGER NOT NULL REFERENCES artists(id),
+    PRIMARY KEY (song_id, artist_id)
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    album_id INTEGER NOT NULL REFERENCES albums(id) ON DELETE CASCADE,
+    song_id INTEGER REFERENCES songs(id),
+    name TEXT,
+    disc_number INTEGER,
+    track_number INTEGER,
+    PRIMARY KEY (album_id, disc_number, track_number)
+);
+CREATE TABLE IF NOT EXISTS lyrics (
+    song_id INTEGER PRIMARY KEY REFERENCES songs(id) ON DELETE CASCADE,
+    title TEXT,
+    wikitext TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_artists_name ON artists(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_albums_name ON albums(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_albums_event ON albums(release_event_id);
+CREATE INDEX IF NOT EXISTS idx_release_events_name ON release_events(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_album_artists_artist ON album_artists(artist_id);
+CREATE INDEX IF NOT EXISTS idx_songs_name ON songs(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_song_artists_artist ON song_artists(artist_id);
+CREATE INDEX IF NOT EXISTS idx_tracks_song ON tracks(song_id);
+"""
+
+# Columns added after a table was first released, as `(table, column, type)`;
+# appended to older databases on open so `SELECT *` column order stays aligned.
+ADDED_COLUMNS = (
+    ('songs', 'additional_names', 'TEXT'),
+)
+
+# Tables copied by `CatalogueStore.merge`, parents first.
+MERGE_TABLES = ('artists', 'release_events', 'albums', 'album_artists', 'songs', 'song_artists', 'tracks', 'lyrics')
+
+
+class CatalogueStore:
+    """
+    Normalized local SQLite copy of the crawled catalogue.
+
+    Records passed to `add` are buffered and upserted in one transaction every
+    `StoreConfig.BATCH_SIZE` records (and on `flush`). Foreign keys are not
+    enforced on insert because the crawler delivers albums before their songs.
+
+    Attributes:
+        - `config`: The `StoreConfig` holding the database path and batch size.
+    """
+    def __init__(self, config=None):
+        self.config = config or StoreConfig()
+        self._db = sqlite3.connect(self.config.PATH)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._pending = {'artist': [], 'album': [], 'song': [], 'lyrics': []}
+        self._pending_count = 0
+
+    def _add_missing_columns(self):
+        for table, column, column_type in ADDED_COLUMNS:
+            columns = {row['name'] for row in self._db.execute(f'PRAGMA table_info({table})')}
+            if column not in columns:
+                self._db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    async def add(self, kind, record):
+        """
+        Queue a raw `artist`, `album`, `song` or `lyrics` record for upsert.
+
+        Async so it can be passed directly as the crawler's `on_record` callback.
+        """
+        self.add_sync(kind, record)
+
+    def add_sync(self, kind, record):
+        # Parse into a slotted model right away so the raw payload can be released.
+        self._pending[kind].append(to_model(kind, record))
+        self._pending_count += 1
+        if self._pending_count >= self.config.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Upsert every buffered record in a single transaction.
+        """
+        if not self._pending_count:
+            return
+        with self._db:
+            self._upsert_artists(self._pending['artist'])
+            self._upsert_albums(self._pending['album'])
+            self._upsert_songs(self._pending['song'])
+            self._upsert_lyrics(self._pending['lyrics'])
+        for records in self._pending.values():
+            records.clear()
+        self._pending_count = 0
+
+    def _upsert_artists(self, artists):
+        self._db.executemany(
+            'INSERT OR REPLACE INTO artists (id, name, additional_names, artist_type, picture)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            [(a.id, a.name, a.additional_names, a.artist_type, a.picture) for a in artists],
+        )
+
+    def _upsert_albums(self, albums):
+        events, album_rows, album_artists, tracks = [], [], [], []
+        for album in albums:
+            if album.release_event_id is not None:
+                events.append((album.release_event_id, album.release_event))
+            album_rows.append((
+                album.id, album.name, album.additional_names, album.artist_string,
+                album.release_date, album.release_event_id, album.picture, album.version,
+            ))
+            album_artists.extend((album.id, artist_id) for artist_id in album.artist_ids)
+            for track in album.tracks:
+                tracks.append((album.id, track.song_id, track.name, track.disc_number, track.track_number))
+
+        ids = [(row[0],) for row in album_rows]
+        self._db.executemany('DELETE FROM album_artists WHERE album_id = ?', ids)
+        self._db.executemany('DELETE FROM tracks WHERE album_id = ?', ids)
+        self._db.executemany('INSERT OR REPLACE INTO release_events (id, name) VALUES (?, ?)', events)
+        self._db.executemany(
+            'INSERT OR REPLACE INTO albums'
+            ' (id, name, additional_names, artist_string, release_date, release_event_id, picture, version)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            album_rows,
+        )
+        self._db.executemany('INSERT OR IGNORE INTO album_artists (album_id, artist_id) VALUES (?, ?)', album_artists)
+        self._db.executemany(
+            'INSERT OR REPLACE INTO tracks (album_id, song_id, name, disc_number, track_number) VALUES (?, ?, ?, ?, ?)',
+            tracks,
+        )
+
+    def _upsert_songs(self, songs):
+        song_rows, song_artists = [], []
+        for song in songs:
+            song_rows.append((
+                song.id, song.name, song.song_type, song.artist_string,
+                song.original_version_id, song.version, song.additional_names,
+            ))
+            song_artists.extend((song.id, artist_id) for artist_id in song.artist_ids)
+        self._db.executemany('DELETE FROM song_artists WHERE song_id = ?', [(row[0],) for row in song_rows])
+        self._db.executemany(
+            'INSERT OR REPLACE INTO songs (id, name, song_type, artist_string, original_version_id, version,'
+            ' additional_names) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            song_rows,
+        )
+        self._db.executemany('INSERT OR IGNORE INTO song_artists (song_id, artist_id) VALUES (?, ?)', song_artists)
+
+    def _upsert_lyrics(self, lyrics):
+        self._db.executemany(
+            'INSERT OR REPLACE INTO lyrics (song_id, title, wikitext) VALUES (?, ?, ?)',
+            [(l.song_id, l.title, l.wikitext) for l in lyrics],
+        )
+
+    def merge(self, path):
+        """
+        Upsert every row of another catalogue database, e.g. one written by a crawl shard.
+
+        Albums and songs found in `path` replace their stored credits and tracks.
+        """
+        self.flush()
+        self._db.execute('ATTACH DATABASE ? AS part', (path,))
+        try:
+            with self._db:
+                self._db.execute('DELETE FROM album_artists WHERE album_id IN (SELECT id FROM part.albums)')
+                self._db.execute('DELETE FROM tracks WHERE album_id IN (SELECT id FROM part.albums)')
+                self._db.execute('DELETE FROM song_artists WHERE song_id IN (SELECT id FROM part.songs)')
+                for table in MERGE_TABLES:
+                    self._db.execute(f'INSERT OR REPLACE INTO main.{table} SELECT * FROM part.{table}')
+        finally:
+            self._db.execute('DETACH DATABASE part')
+
+    def _all(self, query, params=()):
+        return [dict(row) for row in self._db.execute(query, params)]
+
+    def _one(self, query, params=()):
+        row = self._db.execute(query, params).fetchone()
+        return dict(row) if row is not None else None
+
+#///////////////////////////queries//////////////////////////////////////////////////////////////////////////
+    def artist_by_id(self, artist_id):
+        return self._one('SELECT * FROM artists WHERE id = ?', (artist_id,))
+
+    def artist_by_name(self, name):
+        return self._one('SELECT * FROM artists WHERE name = ? COLLATE NOCASE', (name,))
+
+    def album_by_id(self, album_id):
+        return self._one('SELECT * FROM albums WHERE id = ?', (album_id,))
+
+    def album_by_name(self, name):
+        return self._one('SELECT * FROM albums WHERE name = ? COLLATE NOCASE', (name,))
+
+    def albums_by_artist(self, artist_id):
+        return self._all(
+            'SELECT albums.* FROM albums JOIN album_artists ON album_artists.album_id = albums.id'
+            ' WHERE album_artists.artist_id = ? ORDER BY albums.name',
+            (artist_id,),
+        )
+
+    def albums_by_event(self, event_name):
+        return self._all(
+            'SELECT albums.* FROM albums JOIN release_events ON release_events.id = albums.release_event_id'
+            ' WHERE release_events.name = ? COLLATE NOCASE ORDER BY albums.name',
+            (event_name,),
+        )
+
+    def album_tracks(self, album_id):
+        return self._all(
+            'SELECT * FROM tracks WHERE album_id = ? ORDER BY disc_number, track_number',
+            (album_id,),
+        )
+
+    def song_by_id(self, song_id):
+        return self._one('SELECT * FROM songs WHERE id = ?', (song_id,))
+
+    def song_by_name(self, name):
+        return self._one('SELECT * FROM songs WHERE name = ? COLLATE NOCASE', (name,))
+
+    def songs_by_artist(self, artist_id):
+        return self._all(
+            'SELECT DISTINCT songs.* FROM songs'
+            ' LEFT JOIN song_artists ON song_artists.song_id = songs.id'
+            ' LEFT JOIN tracks ON tracks.song_id = songs.id'
+            ' LEFT JOIN album_artists ON album_artists.album_id = tracks.album_id'
+            ' WHERE song_artists.artist_id = ? OR album_artists.artist_id = ?'
+            ' ORDER BY songs.name',
+            (artist_id, artist_id),
+        )
+
+    def lyrics_for_song(self, song_id):
+        return self._one('SELECT * FROM lyrics WHERE song_id = ?', (song_id,))
+
+    def album_versions(self, artist_id):
+        """
+        Map the IDs of a circle's stored albums to their TouhouDB version.
+        """
+        return {
+            row['id']: row['version']
+            for row in self._db.execute(
+                'SELECT albums.id, albums.version FROM albums'
+                ' JOIN album_artists ON album_artists.album_id = albums.id'
+                ' WHERE album_artists.artist_id = ?',
+                (artist_id,),
+            )
+        }
+
+    def song_versions(self, song_ids):
+        """
+        Map the given song IDs that are stored to their TouhouDB version.
+        """
+        versions = {}
+        song_ids = list(song_ids)
+        for i in range(0, len(song_ids), 500):
+            chunk = song_ids[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in self._db.execute(f'SELECT id, version FROM songs WHERE id IN ({placeholders})', chunk):
+                versions[row['id']] = row['version']
+        return versions
+
+    def remove_albums(self, album_ids):
+        with self._db:
+            ids = [(album_id,) for album_id in album_ids]
+            self._db.executemany('DELETE FROM tracks WHERE album_id = ?', ids)
+            self._db.executemany('DELETE FROM album_artists WHERE album_id = ?', ids)
+            self._db.executemany('DELETE FROM albums WHERE id = ?', ids)
@@ -0,0 +1,112 @@
+# sync.py
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from projection import MODEL_FIELDS
+from util.concurrency import bounded_gather
+
+
+class IncrementalSync:
+    """
+    Refresh a circle in the local store, fetching only what changed.
+
+    The album list (which carries each album's TouhouDB `version`) is compared
+    with the versions recorded in the `CatalogueStore`. Details are fetched
+    only for new or changed albums, and song details (plus lyrics) only for
+    tracks whose song is new or has a newer version. Only the fields the store
+    keeps (`projection.MODEL_FIELDS`) are requested. Changed albums and songs
+    bypass the in-process caches and revalidate any `ResponseCache` entry, so
+    they are never stored from a stale response.
+
+    Attributes:
+        - `songs_instance`: The `Songs` instance used for fetching; its album and
+          circle instances are reused.
+        - `store`: The `CatalogueStore` holding the previous state.
+    """
+    def __init__(self, songs_instance, store=None, include_lyrics=True):
+        self.songs_instance = songs_instance
+        self.album_instance = songs_instance.album_instance
+        self.store = store if store is not None else songs_instance.store
+        self.include_lyrics = include_lyrics
+        if self.store is None:
+            raise ValueError("IncrementalSync requires a CatalogueStore")
+
+    async def sync_circle(self, artist_id, prune=False):
+        """
+        Bring one circle's albums and songs up to date.
+
+        Args:
+            - `artist_id`: The ID of the circle.
+            - `prune`: Delete stored albums that no longer appear in the listing.
+
+        Returns:
+            A diff dictionary with `added`, `changed`, `removed` and `unchanged`
+            album IDs, `songs_updated` song IDs and per-ID `errors`.
+        """
+        stored = self.store.album_versions(artist_id)
+        listed = {}
+        errors = {}
+        async for album in self.album_instance.iter_albums(artist_id, revalidate=True):
+            if 'error' in album:
+                # A partial listing would make every missing album look removed.
+                return {"error": album['error']}
+            listed[album['id']] = album.get('version')
+
+        diff = {
+            'added': sorted(set(listed) - set(stored)),
+            'changed': sorted(a for a in set(listed) & set(stored) if listed[a] != stored[a]),
+            'removed': sorted(set(stored) - set(listed)),
+            'unchanged': sorted(a for a in set(listed) & set(stored) if listed[a] == stored[a]),
+            'songs_updated': [],
+            'errors': errors,
+        }
+
+        to_fetch = diff['added'] + diff['changed']
+        details, album_errors = await self.album_instance._album_details_many(
+            to_fetch, MODEL_FIELDS['album'], revalidate=True
+        )
+        errors.update(album_errors)
+
+        tracks = {}
+        for album in details:
+            if album is None:
+                continue
+            self.store.add_sync('album', album)
+            for track in album.get('songs', []):
+                song = track.get('song') or {}
+                if song.get('id') is not None:
+                    tracks[song['id']] = song.get('version')
+
+        song_versions = self.store.song_versions(tracks)
+        changed_songs = [song_id for song_id, version in tracks.items() if song_versions.get(song_id) != version]
+        results = await bounded_gather(
+            (self._refresh_song(song_id) for song_id in changed_songs),
+            self.songs_instance.config.MAX_CONCURRENCY,
+        )
+        for song_id, result in zip(changed_songs, results):
+            if isinstance(result, Exception):
+                errors[song_id] = f"{type(result).__name__}: {result}"
+            elif result is not None:
+                errors[song_id] = result
+            else:
+                diff['songs_updated'].append(song_id)
+
+        if prune and diff['removed']:
+            self.store.remove_albums(diff['removed'])
+        self.store.flush()
+        return diff
+
+    async def _refresh_song(self, song_id):
+        details = await self.songs_instance._fetch_song_details(song_id, MODEL_FIELDS['song'], revalidate=True)
+        if 'error' in details:
+            return details['error']
+        self.store.add_sync('song', details)
+        if self.include_lyrics:
+            song_data = details.get('song') or {}
+            lyrics = await self.songs_instance.fetch_lyrics(song_data.get('defaultName') or song_data.get('name'))
+            if 'error' not in lyrics:
+                self.store.add_sync('lyrics', {**lyrics, 'songId': song_id})
+        return None
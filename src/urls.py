@@ -1,4 +1,5 @@
 #urls.py
+import re
 
 class TDB_USAGE_URL:
     URL = "https://touhoudb.com/"
@@ -11,6 +12,14 @@ class TDB_USAGE_URL:
     def search_artist_id_by_name(artist_name):
         return f"{TDB_USAGE_URL.URL}api/artists?name={artist_name}"
 
+    @staticmethod
+    def list_artists():
+        return f"{TDB_USAGE_URL.URL}api/artists"
+
+    @staticmethod
+    def get_artist(artist_id):
+        return f"{TDB_USAGE_URL.URL}api/artists/{artist_id}"
+
     @staticmethod
     def get_artist_details(artist_id):
         return f"{TDB_USAGE_URL.URL}api/artists/{artist_id}/details"
@@ -19,6 +28,10 @@ class TDB_USAGE_URL:
     def search_album_id_by_name(album_name):
         return f"{TDB_USAGE_URL.URL}api/albums?query={album_name}"
 
+    @staticmethod
+    def get_album(album_id):
+        return f"{TDB_USAGE_URL.URL}api/albums/{album_id}"
+
     @staticmethod
     def get_album_details(album_id):
         return f"{TDB_USAGE_URL.URL}api/albums/{album_id}/details"
@@ -27,6 +40,10 @@ class TDB_USAGE_URL:
     def search_song_id_by_name(song_name):
         return f"{TDB_USAGE_URL.URL}api/songs?query={song_name}"
 
+    @staticmethod
+    def get_song(song_id):
+        return f"{TDB_USAGE_URL.URL}api/songs/{song_id}"
+
     @staticmethod
     def get_song_details(song_id):
         return f"{TDB_USAGE_URL.URL}api/songs/{song_id}/details"
@@ -34,6 +51,7 @@ class TDB_USAGE_URL:
 
 class THWIKI:
     API_URL="https://en.touhouwiki.net/api.php?"
+    MAX_TITLES = 50
     TH_HEADERS= {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
         'Accept-Encoding': 'gzip'
@@ -46,8 +64,36 @@ class THWIKI:
 	        "format": "json",
 	        "page": f"Lyrics: {song_title}",
             "redirect":0,
-	        "prop": "wikitext|properties",
+	        "prop": "wikitext|properties|revid",
 	        "utf8": 1,
 	        "formatversion": "2"
         }
-        return PARAM
\ No newline at end of file
+        return PARAM
+
+    @staticmethod
+    def lyrics_query_by_titles(song_titles):
+        PARAM={
+            "action": "query",
+            "format": "json",
+            "prop": "revisions",
+            "rvprop": "content|ids",
+            "rvslots": "main",
+            "titles": "|".join(f"Lyrics: {title}" for title in song_titles),
+            "redirects": 1,
+            "utf8": 1,
+            "formatversion": "2"
+        }
+        return PARAM
+
+
+def endpoint_of(url):
+    """
+    Classify a TouhouDB/TouhouWiki request into the endpoint name used for cache TTLs.
+    """
+    if url.startswith(THWIKI.API_URL.rstrip('?')):
+        return 'lyrics'
+    path = url[len(TDB_USAGE_URL.URL):] if url.startswith(TDB_USAGE_URL.URL) else url
+    match = re.match(r'api/(artists|albums|songs)/\d+', path)
+    if match:
+        return match.group(1)[:-1]
+    return 'search'
@@ -0,0 +1,45 @@
+import asyncio
+
+
+async def bounded_gather(coros, limit):
+    """
+    Run coroutines concurrently with at most `limit` in flight at once.
+
+    Results are returned in input order. Exceptions raised by a coroutine are
+    returned in its slot instead of aborting the rest of the batch.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros), return_exceptions=True)
+
+
+async def resolve_many(names, resolver, limit, normalize):
+    """
+    Resolve a batch of names, issuing one lookup per distinct normalized name.
+
+    Args:
+        - `names`: The names to resolve; duplicates and spelling variants that
+          normalize to the same key share one lookup.
+        - `resolver`: Coroutine function called with a representative name.
+        - `limit`: Maximum number of lookups in flight at once.
+        - `normalize`: Function mapping a name to its deduplication key.
+
+    Returns:
+        A dictionary mapping every input name to its resolved entity, or to an
+        error dictionary when the lookup failed.
+    """
+    keys = {}
+    for name in names:
+        keys.setdefault(normalize(name), name)
+
+    results = await bounded_gather((resolver(name) for name in keys.values()), limit)
+    resolved = {}
+    for key, result in zip(keys, results):
+        if isinstance(result, Exception):
+            result = {"error": f"{type(result).__name__}: {result}"}
+        resolved[key] = result
+    return {name: resolved[normalize(name)] for name in names}
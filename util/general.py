@@ -6,10 +6,11 @@ class TouhouAPI:
     FULL_SEARCH = True
 
     @classmethod
-    def mkfile(cls, dir_path):
-        dir_path = os.path.join(os.getcwd(), 'Artist Data')
+    def mkfile(cls, dir_path=None):
+        dir_path = dir_path or os.path.join(os.getcwd(), 'Artist Data')
         if not os.path.exists(dir_path):
             os.makedirs(dir_path)
+        return dir_path
 
     @classmethod
     def save_img(cls, save_image=None):
@@ -26,11 +27,6 @@ class TouhouAPI:
         if full_search is not None:
             cls.FULL_SEARCH = full_search
 
-    @classmethod
-    def verbose(cls, verbose=True):
-        if verbose is not None:
-            cls.VERBOSE = verbose
-
 
 class CircleConfig:
     MAX_RESULTS = 10
@@ -38,11 +34,14 @@ class CircleConfig:
     CHILD_TAGS = True
     START = 0
     GET_TOTAL_COUNT = True
-    VERBOSE = True
+    CACHE_SIZE = 1024
+    CACHE_TTL = 3600
+    RESOLVE_CONCURRENCY = 8
 
     @classmethod
     def configure(cls, max_results=None, allow_base_voicebanks=None, child_tags=None,
-                  start=None, get_total_count=None):
+                  start=None, get_total_count=None, cache_size=None, cache_ttl=None,
+                  resolve_concurrency=None):
         if max_results is not None:
             cls.MAX_RESULTS = max_results
         if allow_base_voicebanks is not None:
@@ -53,11 +52,299 @@ class CircleConfig:
             cls.START = start
         if get_total_count is not None:
             cls.GET_TOTAL_COUNT = get_total_count
+        if cache_size is not None:
+            cls.CACHE_SIZE = cache_size
+        if cache_ttl is not None:
+            cls.CACHE_TTL = cache_ttl
+        if resolve_concurrency is not None:
+            cls.RESOLVE_CONCURRENCY = resolve_concurrency
 
 
 class AlbumConfig:
-    pass
+    MAX_CONCURRENCY = 5
+    PAGE_SIZE = 50
+    PREFETCH_PAGES = 3
+    CACHE_SIZE = 1024
+    CACHE_TTL = 3600
+
+    @classmethod
+    def configure(cls, max_concurrency=None, page_size=None, prefetch_pages=None,
+                  cache_size=None, cache_ttl=None):
+        if max_concurrency is not None:
+            cls.MAX_CONCURRENCY = max_concurrency
+        if page_size is not None:
+            cls.PAGE_SIZE = page_size
+        if prefetch_pages is not None:
+            cls.PREFETCH_PAGES = prefetch_pages
+        if cache_size is not None:
+            cls.CACHE_SIZE = cache_size
+        if cache_ttl is not None:
+            cls.CACHE_TTL = cache_ttl
+
+
+class ClientConfig:
+    LIMIT = 100
+    LIMIT_PER_HOST = 10
+    DNS_CACHE_TTL = 300
+    KEEPALIVE_TIMEOUT = 30
+    TIMEOUT = 30
+    RATE_LIMITS = {
+        'touhoudb.com': 5.0,
+        'en.touhouwiki.net': 2.0,
+    }
+    DEFAULT_RATE_LIMIT = 5.0
+    BURST = 5
+    MAX_RETRIES = 4
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    @classmethod
+    def configure(cls, limit=None, limit_per_host=None, dns_cache_ttl=None,
+                  keepalive_timeout=None, timeout=None, rate_limits=None, default_rate_limit=None,
+                  burst=None, max_retries=None, backoff_base=None, backoff_max=None):
+        if limit is not None:
+            cls.LIMIT = limit
+        if limit_per_host is not None:
+            cls.LIMIT_PER_HOST = limit_per_host
+        if dns_cache_ttl is not None:
+            cls.DNS_CACHE_TTL = dns_cache_ttl
+        if keepalive_timeout is not None:
+            cls.KEEPALIVE_TIMEOUT = keepalive_timeout
+        if timeout is not None:
+            cls.TIMEOUT = timeout
+        if rate_limits is not None:
+            cls.RATE_LIMITS = {**cls.RATE_LIMITS, **rate_limits}
+        if default_rate_limit is not None:
+            cls.DEFAULT_RATE_LIMIT = default_rate_limit
+        if burst is not None:
+            cls.BURST = burst
+        if max_retries is not None:
+            cls.MAX_RETRIES = max_retries
+        if backoff_base is not None:
+            cls.BACKOFF_BASE = backoff_base
+        if backoff_max is not None:
+            cls.BACKOFF_MAX = backoff_max
 
 
 class SongsConfig:
-    pass
+    MAX_CONCURRENCY = 5
+    LYRICS_CONCURRENCY = 3
+    CACHE_SIZE = 4096
+    CACHE_TTL = 3600
+    RESOLVE_CONCURRENCY = 8
+
+    @classmethod
+    def configure(cls, max_concurrency=None, lyrics_concurrency=None, cache_size=None, cache_ttl=None,
+                  resolve_concurrency=None):
+        if max_concurrency is not None:
+            cls.MAX_CONCURRENCY = max_concurrency
+        if lyrics_concurrency is not None:
+            cls.LYRICS_CONCURRENCY = lyrics_concurrency
+        if cache_size is not None:
+            cls.CACHE_SIZE = cache_size
+        if cache_ttl is not None:
+            cls.CACHE_TTL = cache_ttl
+        if resolve_concurrency is not None:
+            cls.RESOLVE_CONCURRENCY = resolve_concurrency
+
+
+class CacheConfig:
+    PATH = os.path.join(os.getcwd(), 'touhou_cache.sqlite')
+    DEFAULT_TTL = 3600
+    TTLS = {
+        'artist': 86400,
+        'album': 86400,
+        'song': 86400,
+        'search': 3600,
+        'lyrics': 604800,
+    }
+
+    @classmethod
+    def configure(cls, path=None, default_ttl=None, ttls=None):
+        if path is not None:
+            cls.PATH = path
+        if default_ttl is not None:
+            cls.DEFAULT_TTL = default_ttl
+        if ttls is not None:
+            cls.TTLS = {**cls.TTLS, **ttls}
+
+
+class CrawlerConfig:
+    WORKERS = 8
+    MAX_PENDING_CIRCLES = 50
+    CHECKPOINT_PATH = os.path.join(os.getcwd(), 'crawl_checkpoint.json')
+    CHECKPOINT_INTERVAL = 30
+    INCLUDE_LYRICS = True
+    LEAN = False
+    SHARDS = 1
+
+    @classmethod
+    def configure(cls, workers=None, max_pending_circles=None, checkpoint_path=None,
+                  checkpoint_interval=None, include_lyrics=None, lean=None, shards=None):
+        if workers is not None:
+            cls.WORKERS = workers
+        if max_pending_circles is not None:
+            cls.MAX_PENDING_CIRCLES = max_pending_circles
+        if checkpoint_path is not None:
+            cls.CHECKPOINT_PATH = checkpoint_path
+        if checkpoint_interval is not None:
+            cls.CHECKPOINT_INTERVAL = checkpoint_interval
+        if include_lyrics is not None:
+            cls.INCLUDE_LYRICS = include_lyrics
+        if lean is not None:
+            cls.LEAN = lean
+        if shards is not None:
+            cls.SHARDS = shards
+
+
+class ExportConfig:
+    BUFFER_SIZE = 1 << 16
+    COMPRESSION = 'gzip'
+
+    @classmethod
+    def configure(cls, buffer_size=None, compression=None):
+        if buffer_size is not None:
+            cls.BUFFER_SIZE = buffer_size
+        if compression is not None:
+            cls.COMPRESSION = compression
+
+
+class ImageConfig:
+    MAX_CONCURRENCY = 4
+    CHUNK_SIZE = 1 << 16
+    SIZES = ('original',)
+
+    @classmethod
+    def configure(cls, max_concurrency=None, chunk_size=None, sizes=None):
+        if max_concurrency is not None:
+            cls.MAX_CONCURRENCY = max_concurrency
+        if chunk_size is not None:
+            cls.CHUNK_SIZE = chunk_size
+        if sizes is not None:
+            cls.SIZES = tuple(sizes)
+
+
+class StoreConfig:
+    PATH = os.path.join(os.getcwd(), 'touhou_catalogue.sqlite')
+    BATCH_SIZE = 500
+
+    @classmethod
+    def configure(cls, path=None, batch_size=None):
+        if path is not None:
+            cls.PATH = path
+        if batch_size is not None:
+            cls.BATCH_SIZE = batch_size
+
+
+class SearchConfig:
+    FUZZY_THRESHOLD = 0.75
+    MAX_EXPANSIONS = 20
+    EXACT_NAME_SCORE = 10.0
+    MIN_CONFIDENT_SCORE = 10.0
+
+    @classmethod
+    def configure(cls, fuzzy_threshold=None, max_expansions=None, exact_name_score=None,
+                  min_confident_score=None):
+        if fuzzy_threshold is not None:
+            cls.FUZZY_THRESHOLD = fuzzy_threshold
+        if max_expansions is not None:
+            cls.MAX_EXPANSIONS = max_expansions
+        if exact_name_score is not None:
+            cls.EXACT_NAME_SCORE = exact_name_score
+        if min_confident_score is not None:
+            cls.MIN_CONFIDENT_SCORE = min_confident_score
+
+
+class LyricsConfig:
+    PROCESSES = None
+    CACHE_SIZE = 4096
+
+    @classmethod
+    def configure(cls, processes=None, cache_size=None):
+        if processes is not None:
+            cls.PROCESSES = processes
+        if cache_size is not None:
+            cls.CACHE_SIZE = cache_size
+
+
+class DecoderConfig:
+    BACKEND = 'auto'
+
+    @classmethod
+    def configure(cls, backend=None):
+        if backend is not None:
+            cls.BACKEND = backend
+
+
+class LoggingConfig:
+    LEVEL = 'WARNING'
+    JSON = False
+
+    @classmethod
+    def configure(cls, level=None, json_lines=None):
+        if level is not None:
+            cls.LEVEL = level.upper() if isinstance(level, str) else level
+        if json_lines is not None:
+            cls.JSON = json_lines
+
+
+class MetricsConfig:
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    PATH = None
+    OPENMETRICS = False
+
+    @classmethod
+    def configure(cls, buckets=None, path=None, openmetrics=None):
+        if buckets is not None:
+            cls.BUCKETS = tuple(sorted(buckets))
+        if path is not None:
+            cls.PATH = path
+        if openmetrics is not None:
+            cls.OPENMETRICS = openmetrics
+
+
+class ServerConfig:
+    HOST = '127.0.0.1'
+    PORT = 8080
+    RESPONSE_CACHE_SIZE = 1024
+    RESPONSE_TTL = 60
+    STREAM_BATCH = 100
+    COMPRESS_MIN_SIZE = 1024
+
+    @classmethod
+    def configure(cls, host=None, port=None, response_cache_size=None, response_ttl=None,
+                  stream_batch=None, compress_min_size=None):
+        if host is not None:
+            cls.HOST = host
+        if port is not None:
+            cls.PORT = port
+        if response_cache_size is not None:
+            cls.RESPONSE_CACHE_SIZE = response_cache_size
+        if response_ttl is not None:
+            cls.RESPONSE_TTL = response_ttl
+        if stream_batch is not None:
+            cls.STREAM_BATCH = stream_batch
+        if compress_min_size is not None:
+            cls.COMPRESS_MIN_SIZE = compress_min_size
+
+
+class SnapshotConfig:
+    PATH = os.path.join(os.getcwd(), 'touhou_catalogue.snap')
+
+    @classmethod
+    def configure(cls, path=None):
+        if path is not None:
+            cls.PATH = path
+
+
+class GraphConfig:
+    ARTIST_TYPE = 'Circle'
+    TOP_LIMIT = 20
+
+    @classmethod
+    def configure(cls, artist_type=None, top_limit=None):
+        if artist_type is not None:
+            cls.ARTIST_TYPE = artist_type
+        if top_limit is not None:
+            cls.TOP_LIMIT = top_limit
@@ -0,0 +1,82 @@
+import json
+import logging
+import time
+from util.general import LoggingConfig
+
+ROOT_LOGGER = 'touhou'
+
+# Attributes every LogRecord has; anything else was passed through `extra=`.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def get_logger(name):
+    """
+    Return the logger for a module, under the shared `touhou` namespace.
+
+    Until `setup_logging` attaches a handler, only WARNING and above reach
+    stderr, unformatted, through `logging.lastResort`. Call sites use lazy
+    `%`-style arguments, so disabled levels cost one level check.
+    """
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Format records as one line with the fields passed through `extra=`.
+
+    Text mode renders `time level logger message key=value ...`; JSON mode
+    renders one JSON object per line.
+    """
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = _fields(record)
+        if self.json_lines:
+            entry = {
+                "time": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+        line = f"{stamp} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def setup_logging(level=None, json_lines=None, stream=None):
+    """
+    Attach a structured handler to the `touhou` logger.
+
+    Args:
+        - `level`: Level name or number; defaults to `LoggingConfig.LEVEL`.
+        - `json_lines`: Emit JSON lines instead of text; defaults to `LoggingConfig.JSON`.
+        - `stream`: Output stream; defaults to stderr.
+
+    Returns:
+        The configured `touhou` logger.
+    """
+    LoggingConfig.configure(level=level, json_lines=json_lines)
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StructuredFormatter(LoggingConfig.JSON))
+    logger.addHandler(handler)
+    logger.setLevel(LoggingConfig.LEVEL)
+    logger.propagate = False
+    return logger
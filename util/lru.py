@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class AsyncLRU:
+    """
+    Bounded in-memory LRU cache for coroutine results, with single-flight loading.
+
+    Concurrent callers asking for the same missing key share one in-flight
+    load instead of each issuing their own request. The load runs in its own
+    task, so cancelling one caller does not fail the others.
+    """
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def _lookup(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, stored_at = item
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key, default=None):
+        item = self._lookup(key)
+        return default if item is None else item[0]
+
+    def set(self, key, value):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    async def get_or_load(self, key, loader, should_cache=None):
+        """
+        Return the cached value for `key`, or await `loader()` to produce it.
+
+        Args:
+            - `key`: The cache key.
+            - `loader`: A zero-argument coroutine function producing the value.
+            - `should_cache`: Optional predicate; results it rejects (e.g. error
+              dictionaries) are returned to every waiter but not stored.
+        """
+        item = self._lookup(key)
+        if item is not None:
+            return item[0]
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._load(key, loader, should_cache))
+            task.add_done_callback(_retrieve_exception)
+        # Shielded so a cancelled caller stops only its own wait, not the shared load.
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader, should_cache):
+        try:
+            value = await loader()
+        finally:
+            del self._inflight[key]
+        if should_cache is None or should_cache(value):
+            self.set(key, value)
+        return value
+
+
+def _retrieve_exception(task):
+    # Mark a failed load's exception as retrieved when nobody was left waiting on it.
+    if not task.cancelled():
+        task.exception()
+
+
+def not_error(value):
+    """
+    `should_cache` predicate rejecting the `{"error": ...}` dictionaries returned on failures.
+    """
+    return not (isinstance(value, dict) and 'error' in value)
@@ -0,0 +1,85 @@
+import re
+import unicodedata
+
+
+def normalize_name(name):
+    """
+    Normalize an artist, album or song name for use as a lookup key.
+
+    Applies NFKC (folding full-width forms), case-folding and whitespace collapsing.
+    """
+    name = unicodedata.normalize('NFKC', str(name)).casefold()
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+_KANA_ROMAJI = {
+    'あ': 'a', 'い': 'i', 'う': 'u', 'え': 'e', 'お': 'o',
+    'か': 'ka', 'き': 'ki', 'く': 'ku', 'け': 'ke', 'こ': 'ko',
+    'さ': 'sa', 'し': 'shi', 'す': 'su', 'せ': 'se', 'そ': 'so',
+    'た': 'ta', 'ち': 'chi', 'つ': 'tsu', 'て': 'te', 'と': 'to',
+    'な': 'na', 'に': 'ni', 'ぬ': 'nu', 'ね': 'ne', 'の': 'no',
+    'は': 'ha', 'ひ': 'hi', 'ふ': 'fu', 'へ': 'he', 'ほ': 'ho',
+    'ま': 'ma', 'み': 'mi', 'む': 'mu', 'め': 'me', 'も': 'mo',
+    'や': 'ya', 'ゆ': 'yu', 'よ': 'yo',
+    'ら': 'ra', 'り': 'ri', 'る': 'ru', 'れ': 're', 'ろ': 'ro',
+    'わ': 'wa', 'ゐ': 'i', 'ゑ': 'e', 'を': 'o', 'ん': 'n',
+    'が': 'ga', 'ぎ': 'gi', 'ぐ': 'gu', 'げ': 'ge', 'ご': 'go',
+    'ざ': 'za', 'じ': 'ji', 'ず': 'zu', 'ぜ': 'ze', 'ぞ': 'zo',
+    'だ': 'da', 'ぢ': 'ji', 'づ': 'zu', 'で': 'de', 'ど': 'do',
+    'ば': 'ba', 'び': 'bi', 'ぶ': 'bu', 'べ': 'be', 'ぼ': 'bo',
+    'ぱ': 'pa', 'ぴ': 'pi', 'ぷ': 'pu', 'ぺ': 'pe', 'ぽ': 'po',
+    'ゔ': 'vu', 'ぁ': 'a', 'ぃ': 'i', 'ぅ': 'u', 'ぇ': 'e', 'ぉ': 'o',
+    'ゃ': 'ya', 'ゅ': 'yu', 'ょ': 'yo', 'ゎ': 'wa',
+}
+
+_KANA_DIGRAPHS = {
+    'きゃ': 'kya', 'きゅ': 'kyu', 'きょ': 'kyo', 'しゃ': 'sha', 'しゅ': 'shu', 'しょ': 'sho',
+    'ちゃ': 'cha', 'ちゅ': 'chu', 'ちょ': 'cho', 'にゃ': 'nya', 'にゅ': 'nyu', 'にょ': 'nyo',
+    'ひゃ': 'hya', 'ひゅ': 'hyu', 'ひょ': 'hyo', 'みゃ': 'mya', 'みゅ': 'myu', 'みょ': 'myo',
+    'りゃ': 'rya', 'りゅ': 'ryu', 'りょ': 'ryo', 'ぎゃ': 'gya', 'ぎゅ': 'gyu', 'ぎょ': 'gyo',
+    'じゃ': 'ja', 'じゅ': 'ju', 'じょ': 'jo', 'びゃ': 'bya', 'びゅ': 'byu', 'びょ': 'byo',
+    'ぴゃ': 'pya', 'ぴゅ': 'pyu', 'ぴょ': 'pyo', 'ふぁ': 'fa', 'ふぃ': 'fi', 'ふぇ': 'fe',
+    'ふぉ': 'fo', 'てぃ': 'ti', 'でぃ': 'di', 'しぇ': 'she', 'じぇ': 'je', 'ちぇ': 'che',
+}
+
+
+def fold_kana(text):
+    """
+    Convert katakana to hiragana so both scripts share one lookup key.
+    """
+    return ''.join(chr(ord(c) - 0x60) if 'ァ' <= c <= 'ヶ' else c for c in text)
+
+
+def romanize(text):
+    """
+    Transliterate kana to Hepburn-style romaji, leaving other characters untouched.
+
+    Handles digraphs, the sokuon (っ) and the long vowel mark (ー).
+    """
+    text = fold_kana(text)
+    out = []
+    i = 0
+    while i < len(text):
+        pair = text[i:i + 2]
+        if pair in _KANA_DIGRAPHS:
+            out.append(_KANA_DIGRAPHS[pair])
+            i += 2
+            continue
+        char = text[i]
+        if char == 'っ':
+            following = romanize(text[i + 1:i + 3])[:1]
+            out.append(following if following.isalpha() else '')
+        elif char == 'ー':
+            out.append(out[-1][-1] if out and out[-1] else '')
+        else:
+            out.append(_KANA_ROMAJI.get(char, char))
+        i += 1
+    return ''.join(out)
+
+
+def is_cjk(char):
+    return (
+        '぀' <= char <= 'ヿ'
+        or '㐀' <= char <= '鿿'
+        or '豈' <= char <= '﫿'
+    )